@@ -1,36 +1,47 @@
 import streamlit as st
-import pickle
-import numpy as np
 import pandas as pd
 import plotly.express as px
+import plotly.io as pio
 import os
+from model_registry import ModelRegistry
+from history_store import HistoryStore
+from recommend_table import INPUT_COLUMNS
+from heatmap_cache import CrosstabCache
 
 # ---------------- PATH ----------------
 BASE_DIR = os.path.dirname(__file__)
 
+# ---------------- STREAMLIT CONFIG ----------------
+st.set_page_config(page_title="🎵 Adaptive Music Companion", layout="wide")
+
 # ---------------- LOAD MODELS ----------------
+# Loaded once per process; the registry reloads only when a .pkl file's mtime changes
+@st.cache_resource
+def get_model_registry():
+    return ModelRegistry(BASE_DIR)
+
 try:
-    nb_task = pickle.load(open(os.path.join(BASE_DIR, "nb_task.pkl"), "rb"))
-    encoders = pickle.load(open(os.path.join(BASE_DIR, "encoders.pkl"), "rb"))
+    models = get_model_registry().get()
 except Exception as e:
     st.error(f"Error loading models: {e}")
     st.stop()
 
-# ---------------- STREAMLIT CONFIG ----------------
-st.set_page_config(page_title="🎵 Adaptive Music Companion", layout="wide")
-
 # ---------------- SIDEBAR NAVIGATION ----------------
 st.sidebar.title("🎵 Navigation")
 page = st.sidebar.radio("Go to:", ["Home", "Recommendations", "Mood vs Task Heatmap", "History", "Analytics"])
 
 # ---------------- DATASET PATHS ----------------
 DATA_PATH = os.path.join(BASE_DIR, "dataset", "smart_study_data.csv")
-HISTORY_PATH = os.path.join(BASE_DIR, "dataset", "recommendation_history.csv")
-if not os.path.exists(os.path.join(BASE_DIR, "dataset")):
-    os.makedirs(os.path.join(BASE_DIR, "dataset"))
+HISTORY_PATH = os.path.join(BASE_DIR, "dataset", "recommendation_history.csv")   # legacy, imported once
+HISTORY_DB = os.path.join(BASE_DIR, "dataset", "recommendation_history.db")
+HISTORY_PAGE_SIZE = 50
 
 # ---------------- CREATE SAMPLE DATA IF MISSING ----------------
-if not os.path.exists(DATA_PATH):
+@st.cache_resource
+def ensure_sample_data():
+    # Runs once per process instead of on every rerun
+    os.makedirs(os.path.join(BASE_DIR, "dataset"), exist_ok=True)
+    if os.path.exists(DATA_PATH): return
     sample_data = pd.DataFrame({
         "Mood": ["Happy", "Sad", "Calm", "Energetic", "Stressed", "Calm", "Happy",
                  "Energetic", "Sad", "Happy", "Calm", "Stressed", "Energetic", "Happy",
@@ -41,6 +52,18 @@ if not os.path.exists(DATA_PATH):
     })
     sample_data.to_csv(DATA_PATH, index=False)
 
+ensure_sample_data()
+
+@st.cache_resource
+def get_history_store():
+    return HistoryStore(HISTORY_DB, legacy_csv=HISTORY_PATH)
+
+history = get_history_store()
+
+@st.cache_resource
+def get_heatmap_cache():
+    return CrosstabCache(DATA_PATH)
+
 # ---------------- PAGE: HOME ----------------
 if page == "Home":
     st.markdown("<h1 style='color:#4CAF50;'>🎵 Adaptive Music & Productivity Companion</h1>", unsafe_allow_html=True)
@@ -55,12 +78,12 @@ elif page == "Recommendations":
 
     col1, col2 = st.columns(2)
     with col1:
-        mood = st.selectbox("Select Your Mood:", encoders["le_mood"].classes_)
-        activity = st.selectbox("Select Your Activity:", encoders["le_activity"].classes_)
+        mood = st.selectbox("Select Your Mood:", models.classes["le_mood"])
+        activity = st.selectbox("Select Your Activity:", models.classes["le_activity"])
         time_of_day = st.slider("Select Time of Day (Hour 0–23):", 0, 23, 14)
 
     with col2:
-        goal = st.selectbox("Select Your Goal:", encoders["le_goal"].classes_)
+        goal = st.selectbox("Select Your Goal:", models.classes["le_goal"])
 
     if st.button("Get Recommendation"):
         # ---- Music Recommendation ----
@@ -72,16 +95,8 @@ elif page == "Recommendations":
         }
         music_pred = music_map.get((mood, activity), "Soft Background Music")
 
-        # ---- Encode input ----
-        X_user = np.array([[ 
-            encoders["le_mood"].transform([mood])[0],
-            encoders["le_activity"].transform([activity])[0],
-            time_of_day,
-            encoders["le_goal"].transform([goal])[0]
-        ]])
-
-        # ---- Task Prediction ----
-        task_pred = encoders["le_task"].inverse_transform(nb_task.predict(X_user))[0]
+        # ---- Task Prediction (precomputed over every mood/activity/hour/goal) ----
+        task_pred, task_proba = models.table.recommend(mood, activity, time_of_day, goal)
 
         # ---- Time-Based Tip ----
         if 5 <= time_of_day <= 11:
@@ -99,6 +114,8 @@ elif page == "Recommendations":
             st.markdown(f"<div style='background-color:#e8f5e9; padding:10px; border-radius:10px;'>🎧 Music Recommendation:<br><b>{music_pred}</b></div>", unsafe_allow_html=True)
 
         st.info(time_tip)
+        with st.expander("Why this task?"):
+            st.bar_chart(pd.Series(task_proba, name="Probability"))
 
         # ---- Music Embed ----
         playlist_links = {
@@ -117,7 +134,7 @@ elif page == "Recommendations":
         task_status = st.radio(f"Did you complete **{task_pred}**?", ("Not yet", "Done", "Skipped"))
 
         # ---- Save Recommendation ----
-        history_entry = pd.DataFrame([{
+        history.append({
             "Mood": mood,
             "Activity": activity,
             "Goal": goal,
@@ -125,23 +142,34 @@ elif page == "Recommendations":
             "Recommended Task": task_pred,
             "Music": music_pred,
             "Status": task_status
-        }])
-        history_entry.to_csv(HISTORY_PATH, mode='a', header=not os.path.exists(HISTORY_PATH), index=False)
+        })
+
+    # ---- Batch Scoring ----
+    with st.expander("📂 Score many users from a CSV"):
+        st.caption("Columns: " + ", ".join(INPUT_COLUMNS) + " (Time is the hour 0–23)")
+        batch_file = st.file_uploader("Upload users CSV", type=["csv"])
+        if batch_file is not None:
+            try:
+                scored = models.table.recommend_batch(pd.read_csv(batch_file))
+                st.dataframe(scored)
+                st.download_button("📥 Download Recommendations", scored.to_csv(index=False).encode("utf-8"),
+                                   file_name="recommendations.csv", mime="text/csv")
+            except KeyError as e:
+                st.error(f"Missing column: {e}")
 
 # ---------------- PAGE: MOOD VS TASK HEATMAP ----------------
 elif page == "Mood vs Task Heatmap":
     st.markdown("<h2 style='color:#673AB7;'>📊 Mood vs Task Heatmap</h2>", unsafe_allow_html=True)
     try:
-        df = pd.read_csv(DATA_PATH)
-        heatmap_data = pd.crosstab(df["Mood"], df["Task"])
-        fig = px.imshow(
+        # Crosstab grows with appended rows; the figure is rebuilt only when it changes
+        fig_json = get_heatmap_cache().figure_json(lambda heatmap_data: px.imshow(
             heatmap_data,
             text_auto=True,
             color_continuous_scale='Viridis',
             labels=dict(x="Task", y="Mood", color="Count"),
             title="🌈 Mood vs Task Heatmap"
-        )
-        st.plotly_chart(fig)
+        ))
+        st.plotly_chart(pio.from_json(fig_json))
     except Exception as e:
         st.error(f"Failed to load heatmap: {e}")
 
@@ -149,42 +177,40 @@ elif page == "Mood vs Task Heatmap":
 elif page == "History":
     st.markdown("<h2 style='color:#FF9800;'>📝 Recommendation History</h2>", unsafe_allow_html=True)
     try:
-        history_df = pd.read_csv(HISTORY_PATH, on_bad_lines='skip')
-
-        # Ensure required columns exist
-        required_cols = ["Mood", "Activity", "Goal", "Time", "Recommended Task", "Music", "Status"]
-        for col in required_cols:
-            if col not in history_df.columns:
-                history_df[col] = "Not recorded"
-
-        # Add emojis for tasks
-        task_emojis = {
-            "Study": "📚",
-            "Workout": "🏋️‍♂️",
-            "Meditation": "🧘‍♀️",
-            "Coding": "💻",
-            "Relax": "😌",
-            "Reading": "📖",
-            "Exercise": "🏃‍♂️",
-            "Yoga": "🧘",
-            "Project": "📁",
-            "Painting": "🎨",
-            "Nap": "😴",
-            "Debug": "🐞"
-        }
-        history_df["Task Emoji"] = history_df["Recommended Task"].map(task_emojis)
-
-        st.dataframe(history_df[["Mood", "Recommended Task", "Task Emoji", "Status"]])
-
-        csv = history_df.to_csv(index=False).encode('utf-8')
-        st.download_button(
-            label="📥 Download History",
-            data=csv,
-            file_name='recommendation_history.csv',
-            mime='text/csv'
-        )
-    except FileNotFoundError:
-        st.info("No history available yet.")
+        total = history.total()
+        if not total:
+            st.info("No history available yet.")
+        else:
+            # Add emojis for tasks
+            task_emojis = {
+                "Study": "📚",
+                "Workout": "🏋️‍♂️",
+                "Meditation": "🧘‍♀️",
+                "Coding": "💻",
+                "Relax": "😌",
+                "Reading": "📖",
+                "Exercise": "🏃‍♂️",
+                "Yoga": "🧘",
+                "Project": "📁",
+                "Painting": "🎨",
+                "Nap": "😴",
+                "Debug": "🐞"
+            }
+            pages = -(-total // HISTORY_PAGE_SIZE)
+            page_no = st.number_input(f"Page (1–{pages})", min_value=1, max_value=pages, value=pages)
+            history_df = history.page(page_no - 1, HISTORY_PAGE_SIZE)
+            history_df["Task Emoji"] = history_df["Recommended Task"].map(task_emojis)
+            st.caption(f"{total} recommendations recorded")
+            st.dataframe(history_df[["Mood", "Recommended Task", "Task Emoji", "Status"]])
+
+            # Full export is built only on request, not on every rerun
+            if st.button("Prepare full history download"):
+                st.download_button(
+                    label="📥 Download History",
+                    data=history.to_csv_bytes(),
+                    file_name='recommendation_history.csv',
+                    mime='text/csv'
+                )
     except Exception as e:
         st.error(f"Error loading history: {e}")
 
@@ -192,16 +218,17 @@ elif page == "History":
 elif page == "Analytics":
     st.markdown("<h2 style='color:#009688;'>📊 Mood & Task Analytics</h2>", unsafe_allow_html=True)
     try:
-        history_df = pd.read_csv(HISTORY_PATH, on_bad_lines='skip')
-        if not history_df.empty:
+        # Running counts kept by the history store: no scan of the history itself
+        if history.total():
             st.subheader("Most Common Moods")
-            st.bar_chart(history_df['Mood'].value_counts())
+            st.bar_chart(history.counts("Mood"))
 
             st.subheader("Most Recommended Tasks")
-            st.bar_chart(history_df['Recommended Task'].value_counts())
+            st.bar_chart(history.counts("Recommended Task"))
+
+            st.subheader("Task Completion")
+            st.bar_chart(history.counts("Status"))
         else:
             st.info("No data available yet for analytics.")
-    except FileNotFoundError:
-        st.info("No data available yet for analytics.")
     except Exception as e:
         st.error(f"Error loading analytics: {e}")
@@ -0,0 +1,74 @@
+import io
+import os
+import threading
+
+import pandas as pd
+
+# ---------------- MOOD VS TASK CROSSTAB CACHE ----------------
+TAIL_CHECK_BYTES = 64   # bytes before the consumed offset re-read to detect rewrites
+
+
+class CrosstabCache:
+    """Running ``pd.crosstab(df[row], df[col])`` over an append-only CSV.
+
+    Keyed on the file's size and mtime: an unchanged file costs one
+    ``stat``, an appended one parses only the new lines, and anything else
+    (truncated, rewritten) triggers a full rebuild. A last line without a
+    newline is counted like ``read_csv`` would, and the next change rebuilds
+    since that line may have grown. The rendered figure JSON is memoised
+    until the counts change.
+    """
+
+    def __init__(self, path, row="Mood", col="Task"):
+        self.path, self.row, self.col = path, row, col
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self.table = pd.DataFrame(dtype="int64")
+        self.columns, self.offset, self.key, self._tail = None, 0, None, b""
+        self._partial = False   # last consumed line had no newline
+        self._figure = None
+
+    def get(self):
+        """Current crosstab and the (size, mtime_ns) key it reflects."""
+        st = os.stat(self.path)
+        key = (st.st_size, st.st_mtime_ns)
+        with self._lock:
+            if key != self.key:
+                with open(self.path, "rb") as f:
+                    if self._partial or not self._is_append(f, st.st_size): self._reset()
+                    self._consume(f)
+                self.key = key
+            return self.table, self.key
+
+    def _is_append(self, f, size):
+        if self.columns is None or size < self.offset: return False
+        f.seek(self.offset - len(self._tail))
+        return f.read(len(self._tail)) == self._tail
+
+    def _consume(self, f):
+        f.seek(self.offset)
+        data = f.read()
+        if not data: return
+        end = len(data)
+        self._partial = not data.endswith(b"\n")
+        if self.columns is None:
+            chunk = pd.read_csv(io.BytesIO(data), on_bad_lines="skip")
+            self.columns = list(chunk.columns)
+        else:
+            chunk = pd.read_csv(io.BytesIO(data), header=None, names=self.columns, on_bad_lines="skip")
+        if len(chunk):
+            delta = pd.crosstab(chunk[self.row], chunk[self.col])
+            self.table = self.table.add(delta, fill_value=0).fillna(0).astype("int64")
+            self._figure = None
+        self.offset += end
+        f.seek(self.offset - min(TAIL_CHECK_BYTES, self.offset))
+        self._tail = f.read(self.offset - f.tell())
+
+    def figure_json(self, render):
+        """``render(table).to_json()``, recomputed only when the counts change."""
+        table, _ = self.get()
+        with self._lock:
+            if self._figure is None: self._figure = render(table).to_json()
+            return self._figure
@@ -0,0 +1,119 @@
+import os
+import sqlite3
+import threading
+
+import pandas as pd
+
+# ---------------- HISTORY STORE ----------------
+HISTORY_COLUMNS = ["Mood", "Activity", "Goal", "Time", "Recommended Task", "Music", "Status"]
+COUNTED_COLUMNS = ("Mood", "Recommended Task", "Status")
+BUSY_TIMEOUT_MS = 5000
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS history (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    mood TEXT, activity TEXT, goal TEXT, time INTEGER,
+    task TEXT, music TEXT, status TEXT
+);
+CREATE TABLE IF NOT EXISTS counts (
+    field TEXT NOT NULL, value TEXT NOT NULL, n INTEGER NOT NULL,
+    PRIMARY KEY (field, value)
+) WITHOUT ROWID;
+"""
+_FIELDS = ["mood", "activity", "goal", "time", "task", "music", "status"]   # same order as HISTORY_COLUMNS
+
+
+class HistoryStore:
+    """Append-only recommendation history in SQLite (WAL) with running counts.
+
+    Each append inserts the row and bumps the ``counts`` table for
+    ``COUNTED_COLUMNS`` in one write transaction, so concurrent writers
+    (other sessions or processes) never see the two disagree. Analytics
+    reads only ``counts``; History reads one page by id range.
+    """
+
+    def __init__(self, path, legacy_csv=None):
+        self.path = path
+        self._local = threading.local()
+        with self._conn(write=True) as conn:
+            for stmt in filter(str.strip, _SCHEMA.split(";")): conn.execute(stmt)
+            # Migrate the old append-mode CSV once, inside the lock so two processes can't both import it
+            if legacy_csv and os.path.exists(legacy_csv) and not conn.execute("SELECT 1 FROM history LIMIT 1").fetchone():
+                self._import_csv(conn, legacy_csv)
+
+    def _conn(self, write=False):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=BUSY_TIMEOUT_MS / 1000, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
+            self._local.conn = conn
+        return _Transaction(conn, write)
+
+    def append(self, entries):
+        """Append one entry (dict keyed by HISTORY_COLUMNS) or a list of them."""
+        if isinstance(entries, dict): entries = [entries]
+        with self._conn(write=True) as conn: self._insert(conn, entries)
+
+    @staticmethod
+    def _insert(conn, entries):
+        rows = [tuple(e.get(c, "Not recorded") for c in HISTORY_COLUMNS) for e in entries]
+        counted = [HISTORY_COLUMNS.index(c) for c in COUNTED_COLUMNS]
+        conn.executemany(f"INSERT INTO history ({', '.join(_FIELDS)}) VALUES ({', '.join('?' * len(_FIELDS))})", rows)
+        conn.executemany(
+            "INSERT INTO counts (field, value, n) VALUES (?, ?, 1) "
+            "ON CONFLICT (field, value) DO UPDATE SET n = n + 1",
+            [(HISTORY_COLUMNS[i], str(row[i])) for row in rows for i in counted])
+
+    @classmethod
+    def _import_csv(cls, conn, path, chunksize=50_000):
+        for chunk in pd.read_csv(path, on_bad_lines="skip", chunksize=chunksize):
+            for col in HISTORY_COLUMNS:
+                if col not in chunk.columns: chunk[col] = "Not recorded"
+            chunk = chunk[HISTORY_COLUMNS].fillna("Not recorded")
+            cls._insert(conn, chunk.to_dict("records"))
+
+    def total(self):
+        with self._conn() as conn:
+            return conn.execute("SELECT COALESCE(MAX(id), 0) FROM history").fetchone()[0]
+
+    def counts(self, column):
+        """Running value counts for one of COUNTED_COLUMNS, largest first."""
+        with self._conn() as conn:
+            rows = conn.execute("SELECT value, n FROM counts WHERE field = ? ORDER BY n DESC", (column,)).fetchall()
+        return pd.Series({v: n for v, n in rows}, name="count", dtype="int64")
+
+    def page(self, page, page_size=50):
+        """Rows ``page * page_size`` .. ``+ page_size`` in insertion order.
+
+        Ids are never deleted or rolled back, so a page is an index range
+        scan on the primary key however long the history gets.
+        """
+        first = page * page_size + 1
+        with self._conn() as conn:
+            rows = conn.execute(f"SELECT {', '.join(_FIELDS)} FROM history WHERE id >= ? AND id < ? ORDER BY id",
+                                (first, first + page_size)).fetchall()
+        return pd.DataFrame(rows, columns=HISTORY_COLUMNS)
+
+    def to_csv_bytes(self, chunksize=50_000):
+        """Whole history as CSV, read in id-ordered chunks."""
+        with self._conn() as conn:
+            chunks = pd.read_sql_query(f"SELECT {', '.join(_FIELDS)} FROM history ORDER BY id", conn, chunksize=chunksize)
+            parts = [c.set_axis(HISTORY_COLUMNS, axis=1).to_csv(index=False, header=i == 0) for i, c in enumerate(chunks)]
+        return "".join(parts or [",".join(HISTORY_COLUMNS) + "\n"]).encode("utf-8")
+
+
+class _Transaction:
+    """``with`` block around one transaction; writers take the lock up front
+    (BEGIN IMMEDIATE) so they queue on busy_timeout instead of deadlocking."""
+
+    def __init__(self, conn, write):
+        self.conn, self.write = conn, write
+
+    def __enter__(self):
+        self.conn.execute("BEGIN IMMEDIATE" if self.write else "BEGIN")
+        return self.conn
+
+    def __exit__(self, exc_type, *exc):
+        self.conn.execute("ROLLBACK" if exc_type else "COMMIT")
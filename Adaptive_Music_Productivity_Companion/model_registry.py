@@ -0,0 +1,58 @@
+import hashlib
+import os
+import pickle
+import threading
+import time
+
+from recommend_table import TABLE_FILE, load_or_build
+
+# ---------------- MODEL REGISTRY ----------------
+MODEL_FILES = {"nb_task": "nb_task.pkl", "encoders": "encoders.pkl"}
+CHECK_INTERVAL = 2.0  # seconds between mtime checks
+
+
+class LoadedModels:
+    """One consistent snapshot of the pickled model and encoders.
+
+    ``classes[name]`` is each encoder's code-to-label list (the UI choices)
+    and ``table`` the precomputed RecommendationTable for this ``nb_task``,
+    which does all encoding, scoring and decoding.
+    """
+
+    def __init__(self, nb_task, encoders, mtimes, model_key=""):
+        self.nb_task, self.encoders, self.mtimes, self.model_key = nb_task, encoders, mtimes, model_key
+        self.classes = {name: [str(c) for c in enc.classes_] for name, enc in encoders.items()}
+        self.table = None
+
+
+class ModelRegistry:
+    """Process-wide holder of the Companion's models with mtime-based hot reload."""
+
+    def __init__(self, base_dir, files=MODEL_FILES, check_interval=CHECK_INTERVAL, table_path=TABLE_FILE):
+        self.paths = {key: os.path.join(base_dir, name) for key, name in files.items()}
+        self.table_path = table_path and os.path.join(base_dir, table_path)
+        self.check_interval = check_interval
+        self._models, self._checked = None, 0.0
+        self._lock = threading.Lock()
+
+    def _mtimes(self):
+        return {key: os.stat(path).st_mtime_ns for key, path in self.paths.items()}
+
+    def get(self):
+        now = time.monotonic()
+        models = self._models
+        if models is not None and now - self._checked < self.check_interval: return models
+        with self._lock:
+            mtimes = self._mtimes()
+            if self._models is None or mtimes != self._models.mtimes:
+                loaded, digest = {}, hashlib.blake2b(digest_size=16)
+                for key, path in self.paths.items():
+                    with open(path, "rb") as f: raw = f.read()
+                    digest.update(raw)
+                    loaded[key] = pickle.loads(raw)
+                models = LoadedModels(loaded["nb_task"], loaded["encoders"], mtimes, digest.hexdigest())
+                if self.table_path:
+                    models.table = load_or_build(self.table_path, models.nb_task, models.classes, models.model_key)
+                self._models = models
+            self._checked = now
+            return self._models
@@ -0,0 +1,109 @@
+"""Precomputed task recommendations over the Companion's whole input space.
+
+Usage: python recommend_table.py [--out recommendation_table.npz]
+
+Every (mood, activity, hour, goal) combination is scored once with
+``nb_task``; serving is then a single array index. The table stores the
+hash of the model files and is rebuilt whenever ``nb_task.pkl`` or
+``encoders.pkl`` changes.
+"""
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+# ---------------- LOOKUP TABLE ----------------
+TABLE_FILE = "recommendation_table.npz"
+HOURS = 24
+INPUT_ENCODERS = ("le_mood", "le_activity", "le_goal")
+INPUT_COLUMNS = ["Mood", "Activity", "Time", "Goal"]
+
+
+class RecommendationTable:
+    """``task[m, a, h, g]`` is the predicted task code, ``proba[m, a, h, g]`` the class probabilities."""
+
+    def __init__(self, task, proba, classes, model_key):
+        self.task, self.proba, self.classes, self.model_key = task, proba, classes, model_key
+        self.index = {name: {c: i for i, c in enumerate(classes[name])} for name in INPUT_ENCODERS}
+
+    @classmethod
+    def build(cls, nb_task, classes, model_key=""):
+        shape = (len(classes["le_mood"]), len(classes["le_activity"]), HOURS, len(classes["le_goal"]))
+        m, a, h, g = (axis.ravel() for axis in np.indices(shape))
+        # Model was trained on [mood, activity, hour, goal]
+        X = np.column_stack([m, a, h, g])
+        names = getattr(nb_task, "feature_names_in_", None)
+        if names is not None: X = pd.DataFrame(X, columns=list(names))
+        proba = nb_task.predict_proba(X).astype(np.float32)
+        task = nb_task.classes_[proba.argmax(axis=1)].astype(np.uint8)
+        return cls(task.reshape(shape), proba.reshape(shape + (proba.shape[1],)), classes, model_key)
+
+    def save(self, path):
+        np.savez(path, task=self.task, proba=self.proba, model_key=np.array(self.model_key),
+                 **{f"classes_{name}": np.array(labels) for name, labels in self.classes.items()})
+
+    @classmethod
+    def load(cls, path, model_key):
+        """The saved table, or None if missing or built from a different model file."""
+        if not os.path.exists(path): return None
+        with np.load(path) as data:
+            if str(data["model_key"]) != model_key: return None
+            classes = {k[len("classes_"):]: [str(c) for c in data[k]] for k in data.files if k.startswith("classes_")}
+            return cls(data["task"], data["proba"], classes, model_key)
+
+    def codes(self, mood, activity, hour, goal):
+        return (self.index["le_mood"][mood], self.index["le_activity"][activity], int(hour), self.index["le_goal"][goal])
+
+    def recommend(self, mood, activity, hour, goal):
+        """(task label, {task label: probability}) for one user."""
+        key = self.codes(mood, activity, hour, goal)
+        return self.classes["le_task"][self.task[key]], dict(zip(self.classes["le_task"], self.proba[key].tolist()))
+
+    def recommend_batch(self, df):
+        """Score many users at once: ``df`` has INPUT_COLUMNS with class labels.
+
+        Returns ``df`` with a ``Recommended Task`` column and one probability
+        column per task; rows with unknown labels or hours get NaN/None.
+        """
+        m = df["Mood"].map(self.index["le_mood"])
+        a = df["Activity"].map(self.index["le_activity"])
+        g = df["Goal"].map(self.index["le_goal"])
+        h = pd.to_numeric(df["Time"], errors="coerce").where(lambda t: t.between(0, HOURS - 1))
+        ok = (m.notna() & a.notna() & h.notna() & g.notna()).to_numpy()
+        key = tuple(s.to_numpy()[ok].astype(np.intp) for s in (m, a, h, g))
+        labels = np.array(self.classes["le_task"], dtype=object)
+        out = df.copy()
+        task = np.full(len(df), None, dtype=object)
+        task[ok] = labels[self.task[key]]
+        out["Recommended Task"] = task
+        proba = np.full((len(df), self.proba.shape[-1]), np.nan, dtype=np.float32)
+        proba[ok] = self.proba[key]
+        for i, label in enumerate(labels): out[f"P({label})"] = proba[:, i]
+        return out
+
+
+def load_or_build(path, nb_task, classes, model_key):
+    """The saved table if it matches ``model_key``; otherwise rebuild and save it."""
+    table = RecommendationTable.load(path, model_key)
+    if table is None:
+        table = RecommendationTable.build(nb_task, classes, model_key)
+        try: table.save(path)
+        except OSError: pass  # read-only deploys still get the in-memory table
+    return table
+
+
+def main():
+    from model_registry import ModelRegistry
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--out", default=os.path.join(base_dir, TABLE_FILE))
+    args = parser.parse_args()
+    models = ModelRegistry(base_dir, table_path=None).get()
+    table = RecommendationTable.build(models.nb_task, models.classes, models.model_key)
+    table.save(args.out)
+    print(f"wrote {table.task.size} recommendations to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
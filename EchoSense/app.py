@@ -1,14 +1,18 @@
 import streamlit as st
 import librosa
-import librosa.display
 import numpy as np
 import matplotlib.pyplot as plt
 import soundfile as sf
-from moviepy import VideoFileClip  # New MoviePy Syntax
-import whisper
 from transformers import pipeline
-import tempfile
+import io
 import os
+from audio_engine import pyin_track, DecodeCache
+from features import extract_features, classify_sound_type, audio_mood
+from media import MEDIA_EXTS, extract_audio
+from serving import WHISPER_SIZES, ServiceBusy, TranscriptionService
+from text_emotion import EmotionClassifier
+from transcription import TranscriptionCheckpoint, transcribe_stream
+from visuals import plot_waveform, plot_spectrogram
 
 # 1. Page Configuration
 st.set_page_config(page_title="EchoSense AI", layout="wide", page_icon="🎙️")
@@ -17,123 +21,142 @@ st.title("🎙️ EchoSense: Audio & Video AI Analyzer")
 # 2. Load Models with Cache (Memory Optimized)
 @st.cache_resource
 def load_ai_models():
-    # 'tiny' model is used to prevent RAM crash on free servers
-    w_model = whisper.load_model("tiny")
+    # Whisper runs in a pool of warmed-up workers ('tiny' preloaded to prevent RAM crash on free servers);
+    # ECHOSENSE_WHISPER_WORKERS / _BACKEND / _QUEUE / _PRELOAD size the pool
+    w_service = TranscriptionService().warm_up()
     e_pipe = pipeline("text-classification", model="j-hartmann/emotion-english-distilroberta-base")
-    return w_model, e_pipe
+    return w_service, e_pipe
 
 with st.spinner("AI மாடல்கள் லோடு ஆகிறது... சற்று காத்திருக்கவும்..."):
-    whisper_model, emotion_pipe = load_ai_models()
+    whisper_service, emotion_pipe = load_ai_models()
+
+ASR_WAIT_SEC = 30  # how long a request may wait for a free Whisper worker
+
+@st.cache_resource
+def get_emotion_classifier():
+    return EmotionClassifier(emotion_pipe)
 
 # 3. Sound Classification Function
-def classify_sound_type(y, sr):
-    spec_centroid = np.mean(librosa.feature.spectral_centroid(y=y, sr=sr))
-    zcr = np.mean(librosa.feature.zero_crossing_rate(y))
-    
-    if spec_centroid < 1500 and zcr < 0.1:
-        return "Door Knock 🚪"
-    elif spec_centroid > 3000:
-        return "Horn 🎺"
-    else:
-        return "Explosion/General Noise 💥"
+# classify_sound_type and the mood heuristic live in features.py, fed by the single-pass extractor
 
 # 4. Sidebar Upload Section
 st.sidebar.header("Media Upload")
 uploaded_file = st.sidebar.file_uploader("Upload Audio/Video", type=["mp3", "wav", "mp4", "m4a", "mov"])
 
-if uploaded_file is not None:
-    # Save upload to a temp file
-    suffix = os.path.splitext(uploaded_file.name)[1]
-    with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tfile:
-        tfile.write(uploaded_file.read())
-        temp_path = tfile.name
+@st.cache_resource
+def get_decode_cache():
+    return DecodeCache()
 
-    # Video processing logic
-    final_audio_path = temp_path
-    if suffix.lower() in [".mp4", ".mov", ".m4a"]:
+def decode_media(data, sr, suffix):
+    if suffix.lower() in MEDIA_EXTS:
         st.sidebar.info("🎥 Video/Media detected. Extracting audio...")
         try:
-            video = VideoFileClip(temp_path)
-            audio_temp = "extracted_audio.wav"
-            # Extracting audio and saving as wav
-            video.audio.write_audiofile(audio_temp, logger=None)
-            final_audio_path = audio_temp
+            # ffmpeg decodes the audio stream straight to 16 kHz mono float32 in one pass
+            return extract_audio(data, sr, suffix), sr
         except Exception as e:
             st.error(f"Error processing video: {e}")
+            st.stop()
+    try:
+        return librosa.load(io.BytesIO(data), sr=sr)
+    except Exception:
+        # Older libsndfile builds cannot read mp3 from memory; ffmpeg always can
+        return extract_audio(data, sr, suffix), sr
+
+@st.cache_data(max_entries=8, show_spinner="Analysing audio...")
+def get_features(file_key, _y, sr):
+    return extract_features(_y, sr)
 
-    # Load audio data for analysis (Resample to 16kHz for Whisper compatibility)
-    y, sr = librosa.load(final_audio_path, sr=16000)
+if uploaded_file is not None:
+    suffix = os.path.splitext(uploaded_file.name)[1]
+
+    # Load audio data for analysis (Resample to 16kHz for Whisper compatibility).
+    # Decoded once per upload content; reruns reuse the cached array.
+    y, sr = get_decode_cache().decode(uploaded_file, 16000, loader=lambda data, rate: decode_media(data, rate, suffix))
+    file_key = DecodeCache.content_key(uploaded_file.getvalue())
     st.sidebar.success("✅ File Loaded")
-    st.audio(final_audio_path)
+    if suffix.lower() in [".mp3", ".wav"]: st.audio(uploaded_file)
+    else: st.audio(y, sample_rate=sr)
 
     # 5. UI Tabs
     tab1, tab2, tab3, tab4 = st.tabs(["📊 Visuals", "🧠 AI Insights", "🎼 Melody Gen", "📝 Transcription"])
 
     with tab1:
         st.subheader("Audio Waveform & Spectrogram")
-        col1, col2 = st.columns(2)
-        with col1:
-            fig, ax = plt.subplots(figsize=(10, 4))
-            librosa.display.waveshow(y, sr=sr, ax=ax)
-            ax.set_title("Waveform")
-            st.pyplot(fig)
-        with col2:
-            fig2, ax2 = plt.subplots(figsize=(10, 4))
-            D = librosa.amplitude_to_db(np.abs(librosa.stft(y)), ref=np.max)
-            img = librosa.display.specshow(D, sr=sr, x_axis='time', y_axis='hz', ax=ax2)
-            plt.colorbar(img, ax=ax2)
-            ax2.set_title("Spectrogram")
-            st.pyplot(fig2)
+        # Drawn only on request; the decimated STFT and envelope are cached per file
+        if st.toggle("Show waveform & spectrogram", key="show_visuals"):
+            vis = get_features(file_key, y, sr)["visuals"]
+            col1, col2 = st.columns(2)
+            with col1:
+                fig = plot_waveform(vis)
+                st.pyplot(fig); plt.close(fig)
+            with col2:
+                fig2 = plot_spectrogram(vis)
+                st.pyplot(fig2); plt.close(fig2)
 
     with tab2:
         st.subheader("Intelligent Audio Metrics")
-        # Tempo detection
-        onset_env = librosa.onset.onset_strength(y=y, sr=sr)
-        tempo = librosa.beat.tempo(onset_envelope=onset_env, sr=sr)[0]
-        energy = np.mean(librosa.feature.rms(y=y))
+        # Tempo, energy, centroid and ZCR all come from the one cached STFT pass
+        feats = get_features(file_key, y, sr)
         
         c1, c2, c3 = st.columns(3)
-        c1.metric("Estimated BPM", f"{float(tempo):.1f}")
-        c2.metric("Detected Sound", classify_sound_type(y, sr))
-        
-        # Emotion logic based on tempo
-        if float(tempo) > 120 and energy > 0.05: mood = "Energetic 🔥"
-        elif float(tempo) < 80: mood = "Sad/Calm 😢"
-        else: mood = "Neutral 😌"
-        c3.metric("Audio Mood", mood)
+        c1.metric("Estimated BPM", f"{feats['tempo']:.1f}")
+        c2.metric("Detected Sound", classify_sound_type(feats["spectral_centroid"], feats["zcr"]))
+        c3.metric("Audio Mood", audio_mood(feats["tempo"], feats["energy"]))
 
     with tab3:
         st.subheader("Pitch-based Melody Synthesis")
         st.write("Extracting voice pitch and converting to sine wave melody...")
         if st.button("Generate Melody"):
             with st.spinner("Processing Pitch..."):
-                f0, _, _ = librosa.pyin(y, fmin=librosa.note_to_hz('C2'), fmax=librosa.note_to_hz('C7'))
-                f0_clean = np.nan_to_num(f0)
                 hop_len = 512
+                # Long uploads are split across a process pool and stitched back
+                f0_clean = pyin_track(y, sr, hop_len)
                 total_s = len(f0_clean) * hop_len
                 f0_up = np.interp(np.arange(total_s), np.arange(0, total_s, hop_len), f0_clean)
                 phase = 2 * np.pi * np.cumsum(f0_up) / sr
                 music = np.sin(phase)
-                out_path = "synth_melody.wav"
-                sf.write(out_path, music, sr)
-                st.audio(out_path)
+                out_buf = io.BytesIO()
+                sf.write(out_buf, music, sr, format="WAV")
+                st.audio(out_buf)
                 st.success("Synthesis Complete!")
 
     with tab4:
         st.subheader("AI Transcription & Text Emotion")
+        model_size = st.selectbox("Whisper model:", WHISPER_SIZES, key="asr_size")
+        whisper_model = whisper_service.model(model_size, block=ASR_WAIT_SEC)
+        streaming = st.toggle("Streaming mode (skip silence, resumable)", key="stream_asr")
         if st.button("Start Transcription"):
-            with st.spinner("AI is listening..."):
-                # Passing the audio array directly to avoid path issues
-                result = whisper_model.transcribe(y)
-                st.markdown(f"**Full Transcript:** \n\n {result['text']}")
-                
+            if streaming:
+                # Speech windows are transcribed one by one and shown as they finish;
+                # a checkpoint per file lets a rerun continue where it stopped
+                bar = st.progress(0.0, text="AI is listening...")
+                live = st.empty()
+                segments = []
+                try:
+                    for done, total, new_segments in transcribe_stream(whisper_model, y, sr, TranscriptionCheckpoint(file_key, model_size)):
+                        segments.extend(new_segments)
+                        bar.progress(done / total if total else 1.0, text=f"Speech window {done}/{total}")
+                        live.markdown("**Live Transcript:** \n\n " + "".join(seg["text"] for seg in segments))
+                except ServiceBusy:
+                    st.warning("⏳ All transcription workers are busy. Press Start again to resume from the checkpoint.")
+                    st.stop()
+
                 st.markdown("---")
                 st.write("**Segment Analysis:**")
-                for segment in result['segments'][:10]:
-                    text_snippet = segment['text']
-                    # Get emotion for each text segment
-                    text_emo = emotion_pipe(text_snippet)[0]['label']
-                    st.write(f"🕒 {segment['start']:.1f}s | **{text_emo.upper()}**: {text_snippet}")
+                st.dataframe(get_emotion_classifier().timeline(segments), use_container_width=True)
+            else:
+                with st.spinner("AI is listening..."):
+                    # Passing the audio array directly to avoid path issues
+                    try: result = whisper_model.transcribe(y)
+                    except ServiceBusy:
+                        st.warning("⏳ All transcription workers are busy. Please try again shortly.")
+                        st.stop()
+                    st.markdown(f"**Full Transcript:** \n\n {result['text']}")
+                
+                    st.markdown("---")
+                    st.write("**Segment Analysis:**")
+                    # Every segment goes through the emotion model in padded mini-batches
+                    st.dataframe(get_emotion_classifier().timeline(result['segments']), use_container_width=True)
 
 else:
     st.info("👈 இடதுபுறம் உள்ள Sidebar-ல் ஒரு ஆடியோ அல்லது வீடியோ கோப்பை அப்லோட் செய்யவும்.")
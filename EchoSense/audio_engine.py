@@ -0,0 +1,153 @@
+import os
+
+import numpy as np
+
+# --- PITCH TRACKING ---
+PYIN_HOP = 512
+PYIN_FMIN = 65.40639132514966   # C2
+PYIN_FMAX = 2093.004522404789   # C7
+CONTEXT_FRAMES = 64             # frames of overlap on each side so pyin's HMM settles
+
+
+def track_pitch(audio, sr, hop_length=PYIN_HOP):
+    import librosa
+    f0, _, _ = librosa.pyin(audio, fmin=PYIN_FMIN, fmax=PYIN_FMAX, sr=sr, hop_length=hop_length)
+    return np.nan_to_num(f0)
+
+
+def frame_segments(n_samples, hop_length, block_frames, context_frames):
+    """Split a signal into frame-aligned pyin segments with overlap.
+
+    Yields ``(a, b, left, seg_start, seg_end)``: the segment's samples
+    ``[seg_start, seg_end)`` cover global frames ``a - left`` onwards, and
+    frames ``[a, b)`` are the ones to keep from it.
+    """
+    total_frames = 1 + n_samples // hop_length
+    for a in range(0, total_frames, block_frames):
+        b = min(a + block_frames, total_frames)
+        left = min(context_frames, a)
+        yield a, b, left, (a - left) * hop_length, min((b + context_frames) * hop_length, n_samples)
+
+
+# --- PARALLEL PYIN ---
+MIN_SEGMENT_FRAMES = 256        # below this the context overhead outweighs the extra cores
+PARALLEL_MIN_SEC = 20
+_PITCH_POOL = None
+
+def get_pitch_pool(workers=None):
+    global _PITCH_POOL
+    if _PITCH_POOL is None:
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor
+        # spawn, not fork: the Streamlit server process is multi-threaded
+        _PITCH_POOL = ProcessPoolExecutor(max_workers=workers or os.cpu_count(),
+                                          mp_context=multiprocessing.get_context("spawn"))
+    return _PITCH_POOL
+
+
+def parallel_pyin(audio, sr, hop_length=PYIN_HOP, workers=None, context_frames=CONTEXT_FRAMES,
+                  tracker=track_pitch, pool=None):
+    """pyin over frame-aligned overlapping segments on a process pool.
+
+    The stitched track has the same length as a single ``track_pitch`` call
+    and matches it except for rare voicing flips near segment joins.
+    """
+    workers = workers or os.cpu_count() or 1
+    total_frames = 1 + len(audio) // hop_length
+    block = max(MIN_SEGMENT_FRAMES, -(-total_frames // workers))
+    if workers == 1 or block >= total_frames: return tracker(audio, sr, hop_length)
+    pool = pool or get_pitch_pool(workers)
+    segments = list(frame_segments(len(audio), hop_length, block, context_frames))
+    futures = [pool.submit(tracker, np.ascontiguousarray(audio[s0:s1]), sr, hop_length) for _, _, _, s0, s1 in segments]
+    f0 = np.empty(total_frames, dtype=np.float64)
+    for (a, b, left, _, _), fut in zip(segments, futures):
+        f0[a:b] = fut.result()[left:left + b - a]
+    return f0
+
+
+def pyin_track(audio, sr, hop_length=PYIN_HOP):
+    """Single-core pyin for short clips, the process pool for long ones."""
+    if len(audio) < PARALLEL_MIN_SEC * sr or (os.cpu_count() or 1) < 2: return track_pitch(audio, sr, hop_length)
+    return parallel_pyin(audio, sr, hop_length)
+
+
+# --- DECODED UPLOAD CACHE ---
+DECODE_CACHE_BYTES = 512 * 1024 * 1024
+
+
+def librosa_decode(data, sr):
+    import io
+    import librosa
+    return librosa.load(io.BytesIO(data), sr=sr)
+
+
+class DecodeCache:
+    """LRU of decoded float32 audio keyed by (content hash, sample rate).
+
+    Shared by every session of the app, so widget reruns and repeat
+    uploads never decode or resample the same bytes twice. Cached arrays
+    are read-only; copy before modifying in place.
+    """
+
+    def __init__(self, max_bytes=DECODE_CACHE_BYTES):
+        import threading
+        from collections import OrderedDict
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def content_key(data):
+        import hashlib
+        return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+    def decode(self, source, sr=22050, loader=librosa_decode):
+        """Return ``(y, sr)`` for raw bytes or a Streamlit UploadedFile."""
+        data = source.getvalue() if hasattr(source, "getvalue") else bytes(source)
+        key = (self.content_key(data), sr)
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key]
+        y, sr_out = loader(data, sr)
+        y = np.ascontiguousarray(y, dtype=np.float32)
+        y.flags.writeable = False
+        entry = (y, sr_out)
+        if y.nbytes > self.max_bytes: return entry
+        with self._lock:
+            if key not in self._entries:
+                self._entries[key] = entry
+                self.nbytes += y.nbytes
+            while self.nbytes > self.max_bytes:
+                _, (old, _) = self._entries.popitem(last=False)
+                self.nbytes -= old.nbytes
+        return entry
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear(); self.nbytes = 0
+
+
+# --- BLOCK-WISE STFT ---
+STFT_N_FFT = 2048
+STFT_HOP = 512
+
+
+def iter_frame_blocks(y, n_fft=STFT_N_FFT, hop_length=STFT_HOP, block_frames=2048):
+    """Yield ``(first_frame, segment)`` covering ``block_frames`` STFT frames each.
+
+    Segments are zero padded like ``librosa.stft(y)`` (centered, constant
+    mode), so framing a segment with ``n_fft``/``hop_length`` reproduces
+    exactly that block's frames.
+    """
+    pad = n_fft // 2
+    total_frames = 1 + len(y) // hop_length
+    for a in range(0, total_frames, block_frames):
+        b = min(a + block_frames, total_frames)
+        start, stop = a * hop_length - pad, (b - 1) * hop_length + n_fft - pad
+        seg = np.zeros(stop - start, dtype=np.float32)
+        lo, hi = max(start, 0), min(stop, len(y))
+        if hi > lo: seg[lo - start:hi - start] = y[lo:hi]
+        yield a, seg
+
@@ -0,0 +1,187 @@
+"""Headless EchoSense metrics (BPM, energy, sound type, mood) over a whole archive.
+
+Usage: python batch_analyze.py ARCHIVE_DIR results.csv [--workers N] [--format csv|parquet]
+
+Results are appended as files finish, so an interrupted run loses nothing.
+A rerun skips files whose path and mtime were already processed; a file
+whose content hash was already analysed gets its own row with the stored
+metrics instead of being decoded again. Failed files are recorded with an
+error and retried on the next run.
+"""
+import argparse
+import csv
+import glob
+import hashlib
+import os
+import time
+
+from media import MEDIA_EXTS
+
+AUDIO_EXTS = (".mp3", ".wav", ".flac", ".ogg")
+ANALYSIS_SR = 16000
+COLUMNS = ["path", "sha", "mtime_ns", "duration", "tempo", "energy", "spectral_centroid", "zcr", "sound_type", "mood", "error"]
+PARQUET_FLUSH_ROWS = 500
+
+
+def file_sha(path, chunk=1 << 20):
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(chunk), b""): h.update(block)
+    return h.hexdigest()
+
+
+def iter_media(root):
+    exts = AUDIO_EXTS + MEDIA_EXTS
+    for dirpath, _, files in os.walk(root):
+        for name in sorted(files):
+            if name.lower().endswith(exts): yield os.path.join(dirpath, name)
+
+
+def analyze_file(path, sha, mtime_ns, sr=ANALYSIS_SR):
+    """Decode one file and compute the Insights-tab metrics; never raises."""
+    row = {"path": path, "sha": sha, "mtime_ns": mtime_ns, "error": ""}
+    try:
+        from features import extract_features, classify_sound_type, audio_mood
+        if path.lower().endswith(MEDIA_EXTS):
+            from media import extract_audio
+            y = extract_audio(path, sr)
+        else:
+            import librosa
+            y, _ = librosa.load(path, sr=sr)
+        feats = extract_features(y, sr, with_visuals=False)
+        row.update(feats)
+        row["sound_type"] = classify_sound_type(feats["spectral_centroid"], feats["zcr"])
+        row["mood"] = audio_mood(feats["tempo"], feats["energy"])
+    except Exception as e:
+        row["error"] = f"{type(e).__name__}: {e}"
+    return row
+
+
+def copy_row(row, path, mtime_ns):
+    """``row``'s metrics recorded for a duplicate file at ``path``."""
+    return {**row, "path": path, "mtime_ns": mtime_ns}
+
+
+class CsvSink:
+    def __init__(self, path):
+        self.path = path
+
+    def done(self):
+        if not os.path.exists(self.path): return []
+        with open(self.path, newline="", encoding="utf-8") as f:
+            return [r for r in csv.DictReader(f) if not r.get("error")]
+
+    def __enter__(self):
+        new = not os.path.exists(self.path) or os.path.getsize(self.path) == 0
+        self._f = open(self.path, "a", newline="", encoding="utf-8")
+        self._w = csv.DictWriter(self._f, fieldnames=COLUMNS, extrasaction="ignore")
+        if new: self._w.writeheader(); self._f.flush()  # before the pool forks, or workers re-flush it
+        return self
+
+    def write(self, row):
+        self._w.writerow(row); self._f.flush()
+
+    def __exit__(self, *exc):
+        self._f.close()
+
+
+class ParquetSink:
+    """One part file per run under ``path``; rows are flushed as row groups."""
+
+    def __init__(self, path):
+        self.path = path
+
+    def done(self):
+        import pyarrow.parquet as pq
+        rows = []
+        for part in sorted(glob.glob(os.path.join(self.path, "part-*.parquet"))):
+            rows.extend(r for r in pq.read_table(part).to_pylist() if not r["error"])
+        return rows
+
+    def __enter__(self):
+        os.makedirs(self.path, exist_ok=True)
+        self._part = os.path.join(self.path, f"part-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}.parquet")
+        self._writer, self._rows = None, []
+        return self
+
+    def write(self, row):
+        self._rows.append({c: row.get(c) for c in COLUMNS})
+        if len(self._rows) >= PARQUET_FLUSH_ROWS: self._flush()
+
+    def _flush(self):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        if not self._rows: return
+        table = pa.Table.from_pylist(self._rows, schema=self._schema())
+        if self._writer is None: self._writer = pq.ParquetWriter(self._part, table.schema)
+        self._writer.write_table(table)
+        self._rows = []
+
+    @staticmethod
+    def _schema():
+        import pyarrow as pa
+        floats = ("duration", "tempo", "energy", "spectral_centroid", "zcr")
+        return pa.schema([(c, pa.int64() if c == "mtime_ns" else pa.float64() if c in floats else pa.string()) for c in COLUMNS])
+
+    def __exit__(self, *exc):
+        self._flush()
+        if self._writer is not None: self._writer.close()
+
+
+def run(root, sink, workers=None, sr=ANALYSIS_SR, report_every=50):
+    from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+    done = sink.done()
+    seen_stat = {(r["path"], int(r["mtime_ns"])) for r in done}
+    by_sha = {r["sha"]: r for r in done}    # finished metrics, reused for duplicate files
+    waiting = {}                            # sha in flight -> [(path, mtime_ns)] of its duplicates
+    workers = workers or os.cpu_count() or 1
+    processed = skipped = failed = 0
+    start = time.perf_counter()
+    with sink, ProcessPoolExecutor(max_workers=workers) as pool:
+        inflight = set()
+
+        def drain():
+            nonlocal processed, failed
+            finished, rest = wait(inflight, return_when=FIRST_COMPLETED)
+            for fut in finished:
+                row = fut.result()
+                sink.write(row)
+                if row["error"]: failed += 1
+                else: by_sha[row["sha"]] = row
+                for path, mtime_ns in waiting.pop(row["sha"], []): sink.write(copy_row(row, path, mtime_ns))
+                processed += 1
+                if processed % report_every == 0:
+                    print(f"{processed} analysed, {skipped} skipped, {failed} failed  "
+                          f"({processed / (time.perf_counter() - start):.2f} files/s)", flush=True)
+            return rest
+
+        for path in iter_media(root):
+            mtime_ns = os.stat(path).st_mtime_ns
+            if (path, mtime_ns) in seen_stat: skipped += 1; continue
+            sha = file_sha(path)
+            # Duplicates get their own row (and their own path/mtime for the next run) without re-analysis
+            if sha in by_sha: sink.write(copy_row(by_sha[sha], path, mtime_ns)); skipped += 1; continue
+            if sha in waiting: waiting[sha].append((path, mtime_ns)); skipped += 1; continue
+            waiting[sha] = []
+            inflight.add(pool.submit(analyze_file, path, sha, mtime_ns, sr))
+            if len(inflight) >= 4 * workers: inflight = drain()
+        while inflight: inflight = drain()
+    elapsed = time.perf_counter() - start
+    print(f"done: {processed} analysed, {skipped} skipped, {failed} failed in {elapsed:.1f}s "
+          f"({processed / elapsed if elapsed else 0:.2f} files/s)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("root")
+    parser.add_argument("out", help="CSV file, or a directory of part files for --format parquet")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--format", choices=["csv", "parquet"], default="csv")
+    parser.add_argument("--sr", type=int, default=ANALYSIS_SR)
+    args = parser.parse_args()
+    sink = ParquetSink(args.out) if args.format == "parquet" else CsvSink(args.out)
+    run(args.root, sink, args.workers, args.sr)
+
+
+if __name__ == "__main__":
+    main()
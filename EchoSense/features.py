@@ -0,0 +1,75 @@
+import numpy as np
+
+from audio_engine import STFT_N_FFT, STFT_HOP, iter_frame_blocks
+from visuals import SpectrogramPooler, waveform_envelope
+
+# --- SINGLE-PASS AUDIO FEATURES ---
+N_MELS = 128
+
+
+def extract_features(y, sr, n_fft=STFT_N_FFT, hop_length=STFT_HOP, with_visuals=True):
+    """Every EchoSense descriptor from one framing and one magnitude STFT.
+
+    Walks the signal block by block: RMS and zero-crossing rate come from
+    running sums over the block's samples, spectral centroid and the mel
+    power (for onset strength and tempo) from the block's |STFT|, which
+    also feeds the decimated spectrogram for the Visuals tab. Values match
+    the individual librosa calls, except that ZCR's first and last frame
+    see zero padding instead of edge padding.
+    """
+    import librosa
+    total_frames = 1 + len(y) // hop_length
+    n_bins = 1 + n_fft // 2
+    mel_basis = librosa.filters.mel(sr=sr, n_fft=n_fft, n_mels=N_MELS)
+    mel = np.empty((N_MELS, total_frames), dtype=np.float32)
+    rms = np.empty(total_frames, dtype=np.float32)
+    zcr = np.empty(total_frames, dtype=np.float32)
+    centroid = np.empty(total_frames, dtype=np.float32)
+    pooler = SpectrogramPooler(total_frames, n_bins) if with_visuals else None
+    block = pooler.block_frames() if pooler else 2048
+
+    for a, seg in iter_frame_blocks(y, n_fft, hop_length, block):
+        starts = np.arange(0, len(seg) - n_fft + 1, hop_length)
+        b = a + len(starts)
+        # Running sums give every frame's energy and crossing count in one pass over the block
+        sq = np.concatenate([[0.0], np.cumsum(np.square(seg, dtype=np.float64))])
+        rms[a:b] = np.sqrt(np.maximum(sq[starts + n_fft] - sq[starts], 0) / n_fft)
+        zc = np.concatenate([[0], np.cumsum(librosa.zero_crossings(seg, pad=False))])
+        zcr[a:b] = (zc[starts + n_fft] - zc[starts + 1]) / n_fft
+        S = np.abs(librosa.stft(seg, n_fft=n_fft, hop_length=hop_length, center=False))
+        centroid[a:b] = librosa.feature.spectral_centroid(S=S, sr=sr, n_fft=n_fft)[0]
+        mel[:, a:b] = mel_basis @ (S ** 2)
+        if pooler: pooler.add(a, S)
+
+    onset_env = librosa.onset.onset_strength(S=librosa.power_to_db(mel), sr=sr, hop_length=hop_length)
+    tempo_fn = getattr(librosa.feature, "tempo", None) or librosa.beat.tempo
+    tempo = float(tempo_fn(onset_envelope=onset_env, sr=sr, hop_length=hop_length)[0])
+    features = {
+        "tempo": tempo,
+        "energy": float(np.mean(rms)),
+        "spectral_centroid": float(np.mean(centroid)),
+        "zcr": float(np.mean(zcr)),
+        "duration": len(y) / sr,
+    }
+    if pooler:
+        t, lo, hi = waveform_envelope(y, sr)
+        features["visuals"] = {"t": t, "lo": lo, "hi": hi, "D": librosa.amplitude_to_db(pooler.out, ref=np.max),
+                               "extent": (len(y) / sr, sr / 2)}
+    return features
+
+
+# --- HEURISTICS ---
+def classify_sound_type(spec_centroid, zcr):
+    if spec_centroid < 1500 and zcr < 0.1:
+        return "Door Knock 🚪"
+    elif spec_centroid > 3000:
+        return "Horn 🎺"
+    else:
+        return "Explosion/General Noise 💥"
+
+
+def audio_mood(tempo, energy):
+    # Emotion logic based on tempo
+    if tempo > 120 and energy > 0.05: return "Energetic 🔥"
+    elif tempo < 80: return "Sad/Calm 😢"
+    else: return "Neutral 😌"
@@ -0,0 +1,43 @@
+import os
+import shutil
+import subprocess
+import tempfile
+
+import numpy as np
+
+# --- SINGLE-PASS MEDIA DEMUX ---
+MEDIA_EXTS = (".mp4", ".mov", ".m4a", ".mkv", ".webm")
+# Plain mean of the channels present, like librosa (ffmpeg's -ac 1 adds +3 dB)
+DOWNMIX = "pan=mono|c0<c0+c1+c2+c3+c4+c5+c6+c7"
+
+
+def ffmpeg_exe():
+    exe = shutil.which("ffmpeg")
+    if exe: return exe
+    try:
+        import imageio_ffmpeg
+        return imageio_ffmpeg.get_ffmpeg_exe()
+    except ImportError:
+        raise RuntimeError("ffmpeg not found; install it or the imageio-ffmpeg package")
+
+
+def extract_audio(source, sr=16000, suffix=".mp4"):
+    """Decode the audio stream of a media file to mono float32 at ``sr``.
+
+    ffmpeg demuxes, downmixes and resamples in one pass and streams raw
+    samples over a pipe, so nothing is written but the upload itself.
+    ``source`` is a path or the raw bytes of an upload; bytes land in a
+    private scratch directory (containers like mp4 need a seekable input)
+    that is removed afterwards, so concurrent sessions never share files.
+    """
+    with tempfile.TemporaryDirectory(prefix="echosense_") as scratch:
+        if isinstance(source, (bytes, bytearray, memoryview)):
+            path = os.path.join(scratch, "input" + suffix)
+            with open(path, "wb") as f: f.write(source)
+        else: path = source
+        cmd = [ffmpeg_exe(), "-nostdin", "-v", "error", "-i", path, "-map", "0:a:0", "-vn",
+               "-af", DOWNMIX, "-ar", str(sr), "-f", "f32le", "-acodec", "pcm_f32le", "pipe:1"]
+        proc = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.decode("utf-8", "replace").strip() or "ffmpeg failed")
+    return np.frombuffer(proc.stdout, dtype=np.float32)
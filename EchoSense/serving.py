@@ -0,0 +1,108 @@
+import os
+import threading
+
+import numpy as np
+
+# --- WHISPER SERVING POOL ---
+WHISPER_SIZES = ("tiny", "base", "small", "medium")
+SERVE_WORKERS = int(os.environ.get("ECHOSENSE_WHISPER_WORKERS", "1"))
+SERVE_BACKEND = os.environ.get("ECHOSENSE_WHISPER_BACKEND", "thread")     # "thread" or "process"
+SERVE_MAX_QUEUE = int(os.environ.get("ECHOSENSE_WHISPER_QUEUE", "4"))
+SERVE_PRELOAD = tuple(s for s in os.environ.get("ECHOSENSE_WHISPER_PRELOAD", "tiny").split(",") if s)
+
+_worker = threading.local()
+
+
+class ServiceBusy(RuntimeError):
+    """Raised when the request queue is full."""
+
+
+def _worker_model(size):
+    # Each worker thread/process owns its models: Whisper's decoder installs
+    # kv-cache hooks on the model, so one instance must not serve two requests at once
+    models = getattr(_worker, "models", None)
+    if models is None: models = _worker.models = {}
+    if size not in models:
+        import whisper
+        models[size] = whisper.load_model(size)
+    return models[size]
+
+
+def _init_worker(sizes, warm):
+    for size in sizes:
+        model = _worker_model(size)
+        if warm: model.transcribe(np.zeros(16000, dtype=np.float32), fp16=False)
+
+
+def _transcribe(audio, size, options):
+    return _worker_model(size).transcribe(audio, **options)
+
+
+def _noop():
+    return None
+
+
+class TranscriptionService:
+    """A fixed pool of Whisper workers behind a bounded request queue.
+
+    Every worker loads the ``preload`` model sizes when it starts; other
+    sizes load on first use. At most ``max_queue`` requests may wait
+    beyond those running; ``submit`` raises ``ServiceBusy`` past that
+    (or after ``block`` seconds), so callers see backpressure instead of
+    unbounded latency.
+    """
+
+    def __init__(self, workers=SERVE_WORKERS, backend=SERVE_BACKEND, max_queue=SERVE_MAX_QUEUE,
+                 preload=SERVE_PRELOAD, warm=True):
+        self.workers, self.backend, self.preload = max(1, workers), backend, tuple(preload)
+        if backend == "process":
+            import multiprocessing
+            from concurrent.futures import ProcessPoolExecutor
+            self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"),
+                                             initializer=_init_worker, initargs=(self.preload, warm))
+        else:
+            from concurrent.futures import ThreadPoolExecutor
+            self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="whisper",
+                                            initializer=_init_worker, initargs=(self.preload, warm))
+        self._slots = threading.BoundedSemaphore(self.workers + max_queue)
+        self._lock = threading.Lock()
+        self.pending = 0
+
+    def warm_up(self):
+        """Start every worker (loading and warming its models) and wait for them."""
+        futures = [self._pool.submit(_noop) for _ in range(self.workers)]
+        for fut in futures: fut.result()
+        return self
+
+    def submit(self, audio, model_size="tiny", block=0, **options):
+        if model_size not in WHISPER_SIZES: raise ValueError(f"unknown Whisper model size: {model_size}")
+        acquired = self._slots.acquire(timeout=block) if block else self._slots.acquire(blocking=False)
+        if not acquired:
+            raise ServiceBusy(f"{self.pending} transcriptions already queued")
+        with self._lock: self.pending += 1
+        options.setdefault("fp16", False)
+        fut = self._pool.submit(_transcribe, np.ascontiguousarray(audio, dtype=np.float32), model_size, options)
+        fut.add_done_callback(self._release)
+        return fut
+
+    def _release(self, _):
+        with self._lock: self.pending -= 1
+        self._slots.release()
+
+    def transcribe(self, audio, model_size="tiny", block=0, **options):
+        return self.submit(audio, model_size, block, **options).result()
+
+    def model(self, model_size="tiny", block=0):
+        """Whisper-like handle whose ``transcribe`` goes through the pool."""
+        return PooledModel(self, model_size, block)
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+class PooledModel:
+    def __init__(self, service, model_size, block=0):
+        self.service, self.model_size, self.block = service, model_size, block
+
+    def transcribe(self, audio, **options):
+        return self.service.transcribe(audio, self.model_size, self.block, **options)
@@ -0,0 +1,50 @@
+import hashlib
+import threading
+from collections import OrderedDict
+
+# --- BATCHED TEXT EMOTION ---
+EMOTION_BATCH = 32
+EMOTION_CACHE_SIZE = 100_000
+
+
+def text_key(text):
+    return hashlib.blake2b(text.strip().encode("utf-8"), digest_size=16).digest()
+
+
+class EmotionClassifier:
+    """Runs a text-classification pipeline over many snippets in mini-batches.
+
+    Labels are cached by text hash, so repeated lines and reruns cost
+    nothing. Misses are sorted by length before batching to keep padding
+    inside each batch small.
+    """
+
+    def __init__(self, pipe, batch_size=EMOTION_BATCH, max_cache=EMOTION_CACHE_SIZE):
+        self.pipe, self.batch_size, self.max_cache = pipe, batch_size, max_cache
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def classify(self, texts):
+        keys = [text_key(t) for t in texts]
+        labels = [None] * len(texts)
+        missing = {}
+        with self._lock:
+            for i, k in enumerate(keys):
+                if k in self._cache:
+                    self._cache.move_to_end(k); labels[i] = self._cache[k]
+                else: missing.setdefault(k, texts[i].strip())
+        if missing:
+            order = sorted(missing, key=lambda k: len(missing[k]))
+            outputs = self.pipe([missing[k] or "." for k in order], batch_size=self.batch_size, truncation=True)
+            fresh = {k: out["label"] for k, out in zip(order, outputs)}
+            with self._lock:
+                for k, label in fresh.items(): self._cache[k] = label
+                while len(self._cache) > self.max_cache: self._cache.popitem(last=False)
+            labels = [label if label is not None else fresh[k] for label, k in zip(labels, keys)]
+        return labels
+
+    def timeline(self, segments):
+        """One row per Whisper segment: start, end, emotion and text."""
+        labels = self.classify([seg["text"] for seg in segments])
+        return [{"start": round(seg["start"], 1), "end": round(seg["end"], 1), "emotion": label.upper(), "text": seg["text"].strip()}
+                for seg, label in zip(segments, labels)]
@@ -0,0 +1,88 @@
+import json
+import os
+import tempfile
+
+import numpy as np
+
+# --- VAD-GATED STREAMING TRANSCRIPTION ---
+VAD_FRAME_SEC = 0.03
+VAD_THRESHOLD_DB = -35      # frame energy relative to the loudest frame
+MIN_SPEECH_SEC = 0.25
+MIN_SILENCE_SEC = 0.6       # shorter gaps are bridged
+SPEECH_PAD_SEC = 0.2
+MAX_WINDOW_SEC = 30         # Whisper's native context
+CHECKPOINT_DIR = os.environ.get("ECHOSENSE_CHECKPOINTS", os.path.join(tempfile.gettempdir(), "echosense_ckpt"))
+
+
+def energy_vad(y, sr, frame_sec=VAD_FRAME_SEC, threshold_db=VAD_THRESHOLD_DB, min_speech_sec=MIN_SPEECH_SEC,
+               min_silence_sec=MIN_SILENCE_SEC, pad_sec=SPEECH_PAD_SEC):
+    """Speech regions as ``(start, end)`` sample pairs from frame RMS energy."""
+    frame = max(1, int(frame_sec * sr))
+    n_frames = len(y) // frame
+    if n_frames == 0: return [(0, len(y))] if len(y) else []
+    rms = np.sqrt(np.mean(np.square(np.asarray(y[:n_frames * frame], dtype=np.float32).reshape(n_frames, frame)), axis=1))
+    db = 20 * np.log10(np.maximum(rms, 1e-10) / max(float(rms.max()), 1e-10))
+    active = np.flatnonzero(db > threshold_db)
+    if not len(active): return []
+    # Runs of active frames, bridging gaps shorter than min_silence
+    breaks = np.flatnonzero(np.diff(active) > max(1, int(min_silence_sec / frame_sec)))
+    starts = np.concatenate([[active[0]], active[breaks + 1]])
+    ends = np.concatenate([active[breaks], [active[-1]]]) + 1
+    pad = int(pad_sec * sr)
+    return [(max(0, s * frame - pad), min(len(y), e * frame + pad))
+            for s, e in zip(starts, ends) if (e - s) * frame_sec >= min_speech_sec]
+
+
+def speech_windows(regions, sr, max_window_sec=MAX_WINDOW_SEC):
+    """Pack speech regions into windows of at most ``max_window_sec``."""
+    limit = int(max_window_sec * sr)
+    windows = []
+    for s, e in regions:
+        while e - s > limit:
+            windows.append((s, s + limit)); s += limit
+        if windows and e - windows[-1][0] <= limit and s - windows[-1][1] < limit // 4:
+            windows[-1] = (windows[-1][0], e)
+        else: windows.append((s, e))
+    return windows
+
+
+class TranscriptionCheckpoint:
+    """Segments finished so far for one (file, model), saved after every window."""
+
+    def __init__(self, file_key, model_name="tiny", directory=CHECKPOINT_DIR):
+        self.path = os.path.join(directory, f"{file_key}_{model_name}.json")
+        self.done, self.segments = 0, []
+        try:
+            with open(self.path) as f: state = json.load(f)
+            self.done, self.segments = state["done"], state["segments"]
+        except (OSError, ValueError, KeyError): pass
+
+    def save(self, done, new_segments):
+        self.done = done
+        self.segments.extend(new_segments)
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(self.path), suffix=".tmp")
+        with os.fdopen(fd, "w") as f: json.dump({"done": self.done, "segments": self.segments}, f)
+        os.replace(tmp, self.path)
+
+
+def transcribe_stream(model, y, sr, checkpoint=None, **options):
+    """Yield ``(window_index, n_windows, segments)`` as each speech window finishes.
+
+    Silent stretches are never sent to Whisper. With a ``checkpoint``,
+    windows finished by an earlier run are replayed from it first and
+    transcription resumes at the next one.
+    """
+    windows = speech_windows(energy_vad(y, sr), sr)
+    start_at = 0
+    if checkpoint is not None and checkpoint.done:
+        start_at = min(checkpoint.done, len(windows))
+        yield start_at, len(windows), list(checkpoint.segments)
+    options.setdefault("fp16", False)
+    for i in range(start_at, len(windows)):
+        s, e = windows[i]
+        result = model.transcribe(np.ascontiguousarray(y[s:e], dtype=np.float32), **options)
+        segments = [{"start": s / sr + seg["start"], "end": s / sr + seg["end"], "text": seg["text"]}
+                    for seg in result["segments"]]
+        if checkpoint is not None: checkpoint.save(i + 1, segments)
+        yield i + 1, len(windows), segments
@@ -0,0 +1,66 @@
+import numpy as np
+
+# --- SCREEN-RESOLUTION VISUALS ---
+WAVE_POINTS = 2000      # min/max pairs drawn for the waveform
+SPEC_COLS = 1200        # time columns kept in the spectrogram
+SPEC_ROWS = 512         # frequency rows kept in the spectrogram
+
+
+def waveform_envelope(y, sr, points=WAVE_POINTS):
+    """Per-bin min/max of ``y`` so the plot keeps every peak at screen width."""
+    if len(y) <= 2 * points:
+        t = np.arange(len(y)) / sr
+        return t, y, y
+    per_bin = len(y) // points
+    bins = np.asarray(y[:per_bin * points]).reshape(points, per_bin)
+    t = (np.arange(points) + 0.5) * per_bin / sr
+    return t, bins.min(axis=1), bins.max(axis=1)
+
+
+class SpectrogramPooler:
+    """Max-pools |STFT| blocks down to at most ``cols`` x ``rows``.
+
+    Fed block by block, so the full-resolution STFT never exists in memory.
+    """
+
+    def __init__(self, total_frames, n_bins, cols=SPEC_COLS, rows=SPEC_ROWS):
+        self.t_factor = -(-total_frames // cols)
+        self.f_factor = -(-n_bins // rows)
+        self.n_bins = n_bins
+        self.out = np.zeros((-(-n_bins // self.f_factor), -(-total_frames // self.t_factor)), dtype=np.float32)
+
+    def block_frames(self, target=2048):
+        # Blocks must hold whole pooling groups so columns pool identically
+        return self.t_factor * max(1, target // self.t_factor)
+
+    def add(self, first_frame, S):
+        rows = self.out.shape[0] * self.f_factor
+        if rows != self.n_bins: S = np.pad(S, ((0, rows - self.n_bins), (0, 0)))
+        S = S.reshape(self.out.shape[0], self.f_factor, -1).max(axis=1)
+        n = S.shape[1]
+        groups = -(-n // self.t_factor)
+        if n % self.t_factor: S = np.pad(S, ((0, 0), (0, groups * self.t_factor - n)))
+        col = first_frame // self.t_factor
+        self.out[:, col:col + groups] = S.reshape(S.shape[0], groups, self.t_factor).max(axis=2)
+
+
+def plot_waveform(vis):
+    import matplotlib.pyplot as plt
+    fig, ax = plt.subplots(figsize=(10, 4))
+    ax.fill_between(vis["t"], vis["lo"], vis["hi"], linewidth=0.5)
+    ax.set_xlim(0, vis["extent"][0])
+    ax.set_xlabel("Time")
+    ax.set_title("Waveform")
+    return fig
+
+
+def plot_spectrogram(vis):
+    import matplotlib.pyplot as plt
+    fig, ax = plt.subplots(figsize=(10, 4))
+    duration, nyquist = vis["extent"]
+    img = ax.imshow(vis["D"], origin="lower", aspect="auto", cmap="magma", extent=(0, duration, 0, nyquist))
+    plt.colorbar(img, ax=ax, format="%+2.0f dB")
+    ax.set_xlabel("Time")
+    ax.set_ylabel("Hz")
+    ax.set_title("Spectrogram")
+    return fig
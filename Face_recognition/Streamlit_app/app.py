@@ -1,23 +1,62 @@
 import streamlit as st
 import cv2
 import face_recognition
-import pickle
 import numpy as np
+import time
 from PIL import Image
+from gallery_index import GalleryIndex, ANN_MIN_SIZE
+from gallery_file import GalleryFile
+from webcam_pipeline import FacePipeline, DETECT_EVERY, DETECT_SCALE
 
 st.set_page_config(page_title="Face Recognition App", layout="centered")
 
 st.title("😀 Face Recognition using Streamlit")
 st.write("Upload an image or use webcam to recognize faces")
 
-# Load PKL file
-with open("face_encodings.pkl", "rb") as f:
-    data = pickle.load(f)
+# Memory-mapped gallery file; the PKL file is converted to it on first run
+GALLERY_PATH = "face_encodings.fgal"
+PKL_PATH = "face_encodings.pkl"
+
+@st.cache_resource(max_entries=4)
+def load_gallery(ann, stamp):
+    # ``stamp`` (header inode and committed count) changes whenever faces are enrolled, which reopens the map
+    if stamp is not None:
+        gallery = GalleryIndex.from_file(GALLERY_PATH)
+    else:
+        try:
+            GalleryFile.from_pickle(PKL_PATH, GALLERY_PATH)
+            gallery = GalleryIndex.from_file(GALLERY_PATH)
+        except OSError:
+            gallery = GalleryIndex.from_pickle(PKL_PATH)  # read-only deploy: keep the old format
+    return gallery.build_ann() if ann and len(gallery) else gallery
+
+def gallery_stamp():
+    return GalleryFile.stamp(GALLERY_PATH)
+
+gallery_size = len(load_gallery(False, gallery_stamp()))
+use_ann = st.sidebar.checkbox("Approximate search (IVF)", value=gallery_size >= ANN_MIN_SIZE,
+                              help="Scans only the closest clusters of a large gallery")
+gallery = load_gallery(use_ann, gallery_stamp())
+
+def draw_matches(img, face_locations, face_encodings):
+    # One distance computation for every face in the image
+    for (name, distance), location in zip(gallery.match(face_encodings), face_locations):
+        label = name if name == "Unknown" else f"{name} ({distance:.2f})"
+        top, right, bottom, left = location
+        cv2.rectangle(img, (left, top), (right, bottom), (0,255,0), 2)
+        cv2.putText(img, label, (left, top-10),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0,255,0), 2)
+
+def stop_pipeline():
+    # The pipeline's threads hold camera 0 until stopped, whatever the script does next
+    pipeline = st.session_state.pop("face_pipeline", None)
+    if pipeline: pipeline.stop()
 
 option = st.radio("Choose Input Type", ["Upload Image", "Use Webcam"])
 
 # ---------------- IMAGE UPLOAD ---------------- #
 if option == "Upload Image":
+    stop_pipeline()
     uploaded_file = st.file_uploader("Upload Image", type=["jpg", "png", "jpeg"])
 
     if uploaded_file is not None:
@@ -27,52 +66,67 @@ if option == "Upload Image":
         face_locations = face_recognition.face_locations(img_array)
         face_encodings = face_recognition.face_encodings(img_array, face_locations)
 
-        for encoding, location in zip(face_encodings, face_locations):
-            matches = face_recognition.compare_faces(data["encodings"], encoding)
-            name = "Unknown"
-
-            if True in matches:
-                index = matches.index(True)
-                name = data["names"][index]
-
-            top, right, bottom, left = location
-            cv2.rectangle(img_array, (left, top), (right, bottom), (0,255,0), 2)
-            cv2.putText(img_array, name, (left, top-10),
-                        cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0,255,0), 2)
+        draw_matches(img_array, face_locations, face_encodings)
 
         st.image(img_array, caption="Result", use_container_width=True)
 
 # ---------------- WEBCAM ---------------- #
 elif option == "Use Webcam":
     run = st.checkbox("Start Webcam")
+    pipeline_mode = st.checkbox("Pipeline mode (threaded detection + tracking)", value=True)
+    if pipeline_mode:
+        detect_every = st.slider("Detect every N frames", 1, 10, DETECT_EVERY)
+        detect_scale = st.slider("Detection scale", 0.1, 1.0, DETECT_SCALE, 0.05)
 
     FRAME_WINDOW = st.image([])
-    camera = cv2.VideoCapture(0)
-
-    while run:
-        ret, frame = camera.read()
-        if not ret:
-            st.error("Webcam not working")
-            break
-
-        rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-
-        face_locations = face_recognition.face_locations(rgb)
-        face_encodings = face_recognition.face_encodings(rgb, face_locations)
-
-        for encoding, location in zip(face_encodings, face_locations):
-            matches = face_recognition.compare_faces(data["encodings"], encoding)
-            name = "Unknown"
-
-            if True in matches:
-                index = matches.index(True)
-                name = data["names"][index]
-
-            top, right, bottom, left = location
-            cv2.rectangle(rgb, (left, top), (right, bottom), (0,255,0), 2)
-            cv2.putText(rgb, name, (left, top-10),
-                        cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0,255,0), 2)
-
-        FRAME_WINDOW.image(rgb)
 
-    camera.release()
+    if pipeline_mode:
+        STATS_PANEL = st.empty()
+        # Threads outlive reruns, so the pipeline lives in the session and is restarted on setting changes
+        pipeline = st.session_state.get("face_pipeline")
+        if pipeline and (not run or pipeline.error or pipeline.settings != (detect_every, detect_scale) or pipeline.gallery is not gallery):
+            pipeline.stop()
+            pipeline = st.session_state.face_pipeline = None
+        if run and pipeline is None:
+            pipeline = st.session_state.face_pipeline = FacePipeline(gallery, 0, detect_every, detect_scale).start()
+
+        shown = None
+        while run:
+            if pipeline.error:
+                st.error(pipeline.error)
+                break
+            latest = pipeline.latest()
+            if latest is None or latest[0] == shown:
+                time.sleep(0.005)
+                continue
+            start = time.perf_counter()
+            shown, rgb, tracks = latest
+            rgb = rgb.copy()   # the encoder may still be reading this frame
+            for top, right, bottom, left, name in tracks:
+                cv2.rectangle(rgb, (left, top), (right, bottom), (0,255,0), 2)
+                cv2.putText(rgb, name, (left, top-10),
+                            cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0,255,0), 2)
+            FRAME_WINDOW.image(rgb)
+            pipeline.stages["display"].record(time.perf_counter() - start)
+            STATS_PANEL.table(pipeline.stats())
+
+    else:
+        stop_pipeline()
+        camera = cv2.VideoCapture(0)
+
+        while run:
+            ret, frame = camera.read()
+            if not ret:
+                st.error("Webcam not working")
+                break
+
+            rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+
+            face_locations = face_recognition.face_locations(rgb)
+            face_encodings = face_recognition.face_encodings(rgb, face_locations)
+
+            draw_matches(rgb, face_locations, face_encodings)
+
+            FRAME_WINDOW.image(rgb)
+
+        camera.release()
@@ -0,0 +1,172 @@
+"""Index the faces in a photo archive against the gallery, headless.
+
+Usage:
+    python batch_index.py index PHOTO_DIR results.db [--gallery face_encodings.fgal] [--workers N]
+    python batch_index.py search results.db NAME
+
+Decoding and detection run in a process pool; the encodings come back to
+the parent, which matches them against the gallery in vectorised batches
+and stores one (file, box, name, distance) row per face. Files are
+committed together with their faces, so an interrupted run resumes where
+it stopped: a rerun skips files whose path and mtime are already stored.
+"""
+import argparse
+import os
+import sqlite3
+import time
+
+import numpy as np
+
+IMAGE_EXTS = (".jpg", ".jpeg", ".png", ".bmp", ".webp")
+MAX_SIDE = 1600          # larger photos are downscaled before detection
+MATCH_BATCH = 256        # faces matched per gallery distance computation
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY, mtime_ns INTEGER, faces INTEGER, error TEXT
+);
+CREATE TABLE IF NOT EXISTS faces (
+    path TEXT, top INTEGER, right INTEGER, bottom INTEGER, left INTEGER, name TEXT, distance REAL
+);
+CREATE INDEX IF NOT EXISTS faces_name ON faces (name);
+CREATE INDEX IF NOT EXISTS faces_path ON faces (path)
+"""
+
+
+def iter_images(root):
+    for dirpath, _, files in os.walk(root):
+        for name in sorted(files):
+            if name.lower().endswith(IMAGE_EXTS): yield os.path.join(dirpath, name)
+
+
+def detect_file(path, mtime_ns, max_side=MAX_SIDE, model="hog"):
+    """Decode, detect and encode one photo; never raises.
+
+    Returns (path, mtime_ns, boxes in original pixels, float32 encodings, error).
+    """
+    try:
+        import face_recognition
+        from PIL import Image
+        with Image.open(path) as im:
+            im = im.convert("RGB")
+            scale = min(1.0, max_side / max(im.size))
+            if scale < 1: im = im.resize((round(im.width * scale), round(im.height * scale)))
+            rgb = np.asarray(im)
+        boxes = face_recognition.face_locations(rgb, model=model)
+        encodings = np.asarray(face_recognition.face_encodings(rgb, boxes), dtype=np.float32).reshape(-1, 128)
+        boxes = [tuple(round(v / scale) for v in box) for box in boxes]
+        return path, mtime_ns, boxes, encodings, ""
+    except Exception as e:
+        return path, mtime_ns, [], np.empty((0, 128), np.float32), f"{type(e).__name__}: {e}"
+
+
+def load_gallery(path, ann=False):
+    from gallery_index import GalleryIndex
+    gallery = GalleryIndex.from_pickle(path) if path.endswith(".pkl") else GalleryIndex.from_file(path)
+    return gallery.build_ann() if ann and len(gallery) else gallery
+
+
+class ResultStore:
+    def __init__(self, path):
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        with self.conn:
+            for stmt in _SCHEMA.split(";"): self.conn.execute(stmt)
+
+    def done(self):
+        """{path: mtime_ns} of files indexed without error."""
+        return dict(self.conn.execute("SELECT path, mtime_ns FROM files WHERE error = ''"))
+
+    def write(self, results, matches):
+        """Store a batch of detect_file results and their [(name, distance)] in one transaction."""
+        with self.conn:
+            for path, mtime_ns, _, _, _ in results: self.conn.execute("DELETE FROM faces WHERE path = ?", (path,))
+            self.conn.executemany("INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?)",
+                                  [(p, m, len(b), err) for p, m, b, _, err in results])
+            rows = [(p, *map(int, box)) for p, _, boxes, _, _ in results for box in boxes]
+            self.conn.executemany("INSERT INTO faces VALUES (?, ?, ?, ?, ?, ?, ?)",
+                                  [row + (name, dist) for row, (name, dist) in zip(rows, matches)])
+
+    def search(self, name):
+        return self.conn.execute("SELECT path, top, right, bottom, left, distance FROM faces WHERE name = ? "
+                                 "ORDER BY distance", (name,)).fetchall()
+
+    def close(self):
+        self.conn.close()
+
+
+def run(root, store, gallery, workers=None, max_side=MAX_SIDE, model="hog", report_every=100):
+    from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+    done = store.done()
+    workers = workers or os.cpu_count() or 1
+    processed = skipped = failed = faces = 0
+    pending, pending_faces = [], 0
+    start = time.perf_counter()
+
+    def flush():
+        nonlocal pending, pending_faces
+        if not pending: return
+        encodings = np.concatenate([r[3] for r in pending])
+        store.write(pending, gallery.match(encodings) if len(encodings) else [])
+        pending, pending_faces = [], 0
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        inflight = set()
+
+        def drain():
+            nonlocal processed, failed, faces, pending_faces
+            finished, rest = wait(inflight, return_when=FIRST_COMPLETED)
+            for fut in finished:
+                result = fut.result()
+                pending.append(result)
+                pending_faces += len(result[2])
+                faces += len(result[2])
+                if result[4]: failed += 1
+                processed += 1
+                if processed % report_every == 0:
+                    print(f"{processed} images, {faces} faces, {skipped} skipped, {failed} failed  "
+                          f"({processed / (time.perf_counter() - start):.2f} images/s)", flush=True)
+            # Match once enough faces have accumulated, so the gallery scan is amortised
+            if pending_faces >= MATCH_BATCH or len(pending) >= MATCH_BATCH: flush()
+            return rest
+
+        for path in iter_images(root):
+            mtime_ns = os.stat(path).st_mtime_ns
+            if done.get(path) == mtime_ns: skipped += 1; continue
+            inflight.add(pool.submit(detect_file, path, mtime_ns, max_side, model))
+            if len(inflight) >= 4 * workers: inflight = drain()
+        while inflight: inflight = drain()
+        flush()
+    elapsed = time.perf_counter() - start
+    print(f"done: {processed} images, {faces} faces, {skipped} skipped, {failed} failed in {elapsed:.1f}s "
+          f"({processed / elapsed if elapsed else 0:.2f} images/s)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    index = sub.add_parser("index")
+    index.add_argument("root")
+    index.add_argument("db")
+    index.add_argument("--gallery", default="face_encodings.fgal", help=".fgal gallery file or the legacy .pkl")
+    index.add_argument("--workers", type=int, default=None)
+    index.add_argument("--max-side", type=int, default=MAX_SIDE)
+    index.add_argument("--model", choices=["hog", "cnn"], default="hog")
+    index.add_argument("--ann", action="store_true", help="approximate (IVF) gallery search")
+    search = sub.add_parser("search")
+    search.add_argument("db")
+    search.add_argument("name")
+    args = parser.parse_args()
+    store = ResultStore(args.db)
+    try:
+        if args.cmd == "index":
+            run(args.root, store, load_gallery(args.gallery, args.ann), args.workers, args.max_side, args.model)
+        else:
+            for path, top, right, bottom, left, distance in store.search(args.name):
+                print(f"{path}\t({top}, {right}, {bottom}, {left})\t{distance:.3f}")
+    finally:
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,213 @@
+"""Append-only binary face gallery.
+
+Usage:
+    python gallery_file.py convert face_encodings.pkl faces.fgal [--float16]
+    python gallery_file.py enroll faces.fgal NAME IMAGE [IMAGE ...]
+
+Three files share one prefix:
+    faces.fgal        64-byte header (magic, dtype, dim, count) + count x dim matrix
+    faces.fgal.rows   per-face record: squared norm (float32), end offset of its name (uint64)
+    faces.fgal.names  UTF-8 names, back to back
+
+Readers memory-map all three, so opening a gallery of any size is O(1)
+and every process serving it shares the same page-cache copy. Enrollment
+appends rows and names, then bumps ``count`` in the header last, so a
+reader never sees a half-written face. New galleries (``create``,
+``from_pickle``) are built under temporary names and renamed into place
+header last, so a failed conversion never leaves a valid-looking gallery.
+Writers serialise on ``faces.fgal.lock``.
+"""
+import argparse
+import os
+import struct
+import tempfile
+from contextlib import contextmanager
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: single-writer use only
+    fcntl = None
+
+# ---------------- GALLERY FILE ---------------- #
+MAGIC = b"FACEGAL1"
+HEADER = struct.Struct("<8s4sIQ")     # magic, dtype str ("<f4"/"<f2"), dim, count
+HEADER_SIZE = 64
+ROW_DTYPE = np.dtype([("norm", "<f4"), ("name_end", "<u8")])
+SIDECARS = (".rows", ".names")
+
+
+def _dtype(raw):
+    return np.dtype(raw.rstrip(b"\0").decode("ascii"))
+
+
+@contextmanager
+def _writer_lock(path):
+    """Exclusive lock shared by appends and whole-gallery replacement."""
+    with open(path + ".lock", "a") as f:
+        if fcntl: fcntl.flock(f, fcntl.LOCK_EX)
+        yield
+
+
+def _scratch(path):
+    """Unique temporary prefix next to ``path`` (same filesystem, so renames are atomic)."""
+    fd, tmp = tempfile.mkstemp(prefix=os.path.basename(path) + ".", suffix=".tmp", dir=os.path.dirname(path) or ".")
+    os.close(fd)
+    return tmp
+
+
+def _write_empty(path, dim, dtype):
+    with open(path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, np.dtype(dtype).newbyteorder("<").str.encode("ascii"), dim, 0).ljust(HEADER_SIZE, b"\0"))
+    for suffix in SIDECARS: open(path + suffix, "wb").close()
+
+
+def _publish(tmp, path, keep_existing=False):
+    """Rename the gallery built at ``tmp`` over ``path``, sidecars first and the header last."""
+    with _writer_lock(path):
+        if keep_existing and os.path.exists(path): return
+        for suffix in SIDECARS + ("",): os.replace(tmp + suffix, path + suffix)
+
+
+def _discard(tmp):
+    for suffix in SIDECARS + (".lock", ""):
+        try: os.remove(tmp + suffix)
+        except FileNotFoundError: pass
+
+
+class NameTable:
+    """Lazy view of the names file: only the names that are looked up get decoded."""
+
+    def __init__(self, blob, ends):
+        self.blob, self.ends = blob, ends
+
+    def __len__(self):
+        return len(self.ends)
+
+    def __getitem__(self, i):
+        start = int(self.ends[i - 1]) if i > 0 else 0
+        return bytes(self.blob[start:int(self.ends[i])]).decode("utf-8")
+
+    def __iter__(self):
+        return (self[i] for i in range(len(self)))
+
+
+class GalleryFile:
+    """Read-only memory-mapped view of a gallery, plus ``append`` for enrollment."""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f: magic, dtype, dim, count = HEADER.unpack(f.read(HEADER.size))
+        if magic != MAGIC: raise ValueError(f"{path} is not a face gallery file")
+        self.dtype, self.dim, self.count = _dtype(dtype), dim, count
+        self.encodings = self._map(path, self.dtype, (count, dim), HEADER_SIZE)
+        rows = self._map(path + ".rows", ROW_DTYPE, (count,))
+        self.norms = rows["norm"]
+        names_len = int(rows["name_end"][-1]) if count else 0
+        self.names = NameTable(self._map(path + ".names", np.uint8, (names_len,)), rows["name_end"])
+
+    @staticmethod
+    def _map(path, dtype, shape, offset=0):
+        if not np.prod(shape): return np.empty(shape, dtype=dtype)
+        return np.memmap(path, dtype=dtype, mode="r", offset=offset, shape=shape)
+
+    def __len__(self):
+        return self.count
+
+    @staticmethod
+    def stamp(path):
+        """(inode, committed count) of the header; changes on every enrollment or republish, None if absent."""
+        try:
+            with open(path, "rb") as f: return os.fstat(f.fileno()).st_ino, HEADER.unpack(f.read(HEADER.size))[3]
+        except FileNotFoundError:
+            return None
+
+    @classmethod
+    def create(cls, path, dim=128, dtype="float32", exist_ok=False):
+        """Empty gallery at ``path``; with ``exist_ok`` a gallery already there is kept."""
+        tmp = _scratch(path)
+        try:
+            _write_empty(tmp, dim, dtype)
+            _publish(tmp, path, keep_existing=exist_ok)
+        finally:
+            _discard(tmp)
+        return cls(path)
+
+    @staticmethod
+    def append(path, encodings, names):
+        """Enroll faces; safe against concurrent appenders (flock) and concurrent readers."""
+        names = [str(n) for n in names]
+        with _writer_lock(path), open(path, "r+b") as f:
+            magic, dtype, dim, count = HEADER.unpack(f.read(HEADER.size))
+            enc = np.asarray(encodings, dtype=np.float32).reshape(-1, dim)
+            if len(enc) != len(names): raise ValueError("one name per encoding")
+            stored = enc.astype(_dtype(dtype))
+            # Sidecars are cut back to ``count`` first, dropping any tail a crashed append left behind
+            with open(path + ".rows", "r+b") as rf, open(path + ".names", "r+b") as nf:
+                rf.truncate(count * ROW_DTYPE.itemsize)
+                names_end = 0
+                if count:
+                    rf.seek((count - 1) * ROW_DTYPE.itemsize)
+                    names_end = int(np.frombuffer(rf.read(ROW_DTYPE.itemsize), dtype=ROW_DTYPE)["name_end"][0])
+                nf.truncate(names_end)
+                blobs = [n.encode("utf-8") for n in names]
+                rows = np.empty(len(enc), dtype=ROW_DTYPE)
+                as_f32 = stored.astype(np.float32)
+                rows["norm"] = np.einsum("ij,ij->i", as_f32, as_f32)
+                rows["name_end"] = names_end + np.cumsum([len(b) for b in blobs], dtype=np.uint64)
+                nf.seek(names_end); nf.write(b"".join(blobs))
+                rf.seek(count * ROW_DTYPE.itemsize); rf.write(rows.tobytes())
+                f.truncate(HEADER_SIZE + count * dim * stored.itemsize)
+                f.seek(0, os.SEEK_END); f.write(stored.tobytes())
+                for h in (nf, rf, f): h.flush(); os.fsync(h.fileno())
+            # Commit point: readers only see rows below the header's count
+            f.seek(0); f.write(HEADER.pack(magic, dtype, dim, count + len(enc)))
+            f.flush(); os.fsync(f.fileno())
+        return count + len(enc)
+
+    @classmethod
+    def from_pickle(cls, pkl_path, path, dtype="float32"):
+        """Convert the notebook's ``{"encodings", "names"}`` pickle into a gallery file."""
+        import pickle
+        with open(pkl_path, "rb") as f: data = pickle.load(f)
+        tmp = _scratch(path)
+        try:
+            _write_empty(tmp, 128, dtype)
+            if len(data["names"]): cls.append(tmp, np.array(data["encodings"], dtype=np.float32), data["names"])
+            _publish(tmp, path)
+        finally:
+            _discard(tmp)
+        return cls(path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    conv = sub.add_parser("convert")
+    conv.add_argument("pkl")
+    conv.add_argument("out")
+    conv.add_argument("--float16", action="store_true")
+    enroll = sub.add_parser("enroll")
+    enroll.add_argument("gallery")
+    enroll.add_argument("name")
+    enroll.add_argument("images", nargs="+")
+    args = parser.parse_args()
+    if args.cmd == "convert":
+        gallery = GalleryFile.from_pickle(args.pkl, args.out, "float16" if args.float16 else "float32")
+        print(f"wrote {len(gallery)} faces to {args.out}")
+    else:
+        import face_recognition
+        GalleryFile.create(args.gallery, exist_ok=True)
+        encodings = []
+        for image in args.images:
+            found = face_recognition.face_encodings(face_recognition.load_image_file(image))
+            if found: encodings.append(found[0])
+            else: print(f"no face found in {image}")
+        if encodings:
+            total = GalleryFile.append(args.gallery, encodings, [args.name] * len(encodings))
+            print(f"enrolled {len(encodings)} face(s) for {args.name}; gallery has {total}")
+
+
+if __name__ == "__main__":
+    main()
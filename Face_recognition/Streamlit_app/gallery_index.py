@@ -0,0 +1,136 @@
+import pickle
+
+import numpy as np
+
+# ---------------- GALLERY INDEX ---------------- #
+ENCODING_DIM = 128          # dlib face descriptor length
+MATCH_TOLERANCE = 0.6       # same threshold as face_recognition.compare_faces
+GALLERY_BLOCK = 65536       # gallery rows per distance block (bounds the queries x rows matrix)
+ANN_MIN_SIZE = 50_000       # galleries at least this big default to the IVF index
+IVF_PROBE = 8               # inverted lists scanned per query
+IVF_ITERS = 10              # k-means iterations for the coarse quantizer
+IVF_SAMPLE_PER_LIST = 64    # training points per list
+
+
+def _sq_norms(x):
+    x = np.asarray(x, dtype=np.float32)
+    return np.einsum("ij,ij->i", x, x)
+
+
+def _nearest(x, centers, c_norms=None, block=GALLERY_BLOCK):
+    """Index and squared distance of the closest row of ``centers`` for each row of ``x``."""
+    c_norms = _sq_norms(centers) if c_norms is None else c_norms
+    idx = np.empty(len(x), dtype=np.int64)
+    d2 = np.empty(len(x), dtype=np.float32)
+    for a in range(0, len(x), block):
+        xb = np.asarray(x[a:a + block], dtype=np.float32)
+        dist = _sq_norms(xb)[:, None] + c_norms[None, :] - 2.0 * (xb @ centers.T)
+        idx[a:a + block] = dist.argmin(axis=1)
+        d2[a:a + block] = dist[np.arange(len(xb)), idx[a:a + block]]
+    return idx, d2
+
+
+class GalleryIndex:
+    """Known faces as one contiguous float32 (or float16) matrix plus a parallel name array.
+
+    ``match`` compares every face of a frame against the whole gallery with
+    one matrix product per block of gallery rows and returns the closest
+    identity and its distance, instead of the first ``compare_faces`` hit.
+    """
+
+    def __init__(self, encodings, names, tolerance=MATCH_TOLERANCE, norms=None):
+        encodings = np.asarray(encodings)
+        # float16 galleries (and memory maps) are used as-is and upcast block by block
+        if encodings.dtype not in (np.float32, np.float16): encodings = encodings.astype(np.float32)
+        self.encodings = encodings.reshape(-1, ENCODING_DIM)
+        self.names = np.asarray(names, dtype=object) if isinstance(names, (list, tuple)) else names
+        self.tolerance = tolerance
+        self.norms = _sq_norms(self.encodings) if norms is None else norms
+        self.ann = None
+
+    @classmethod
+    def from_pickle(cls, path, **kwargs):
+        """Load the ``{"encodings": [...], "names": [...]}`` pickle made by the training notebook."""
+        with open(path, "rb") as f: data = pickle.load(f)
+        return cls(np.array(data["encodings"], dtype=np.float32), data["names"], **kwargs)
+
+    @classmethod
+    def from_file(cls, path, **kwargs):
+        """Open a memory-mapped gallery file (see gallery_file.py); no data is read up front."""
+        from gallery_file import GalleryFile
+        gallery = GalleryFile(path)
+        return cls(gallery.encodings, gallery.names, norms=gallery.norms, **kwargs)
+
+    def __len__(self):
+        return len(self.names)
+
+    def build_ann(self, n_lists=None, n_probe=IVF_PROBE, seed=0):
+        """Attach an IVF index; ``search`` then scans only ``n_probe`` lists per query."""
+        self.ann = IVFIndex(self.encodings, self.norms, n_lists, n_probe, seed)
+        return self
+
+    def search(self, queries):
+        """(best gallery row, euclidean distance) for each query; row -1 if the gallery is empty."""
+        q = np.asarray(queries, dtype=np.float32).reshape(-1, ENCODING_DIM)
+        if not len(self) or not len(q):
+            return np.full(len(q), -1, dtype=np.int64), np.full(len(q), np.inf, dtype=np.float32)
+        if self.ann is not None: return self.ann.search(q, self.encodings, self.norms)
+        best = np.full(len(q), -1, dtype=np.int64)
+        best_d2 = np.full(len(q), np.inf, dtype=np.float32)
+        q_norms = _sq_norms(q)
+        for a in range(0, len(self), GALLERY_BLOCK):
+            g = np.asarray(self.encodings[a:a + GALLERY_BLOCK], dtype=np.float32)
+            d2 = q_norms[:, None] + self.norms[None, a:a + GALLERY_BLOCK] - 2.0 * (q @ g.T)
+            i = d2.argmin(axis=1)
+            d = d2[np.arange(len(q)), i]
+            better = d < best_d2
+            best[better], best_d2[better] = a + i[better], d[better]
+        return best, np.sqrt(np.maximum(best_d2, 0))
+
+    def match(self, queries):
+        """[(name, distance)] per query; "Unknown" when the closest face is beyond ``tolerance``."""
+        idx, dist = self.search(queries)
+        return [(self.names[i] if i >= 0 and d <= self.tolerance else "Unknown", float(d)) for i, d in zip(idx, dist)]
+
+
+class IVFIndex:
+    """Inverted-file approximate search: k-means coarse lists, exact distances inside the probed lists.
+
+    Gallery rows are grouped by their nearest centroid (``order`` holds the
+    row ids list by list, ``offsets`` the list boundaries), so a query only
+    computes distances to ``n_probe`` lists' worth of faces.
+    """
+
+    def __init__(self, encodings, norms, n_lists=None, n_probe=IVF_PROBE, seed=0):
+        n = len(encodings)
+        n_lists = max(1, min(n, n_lists or int(np.sqrt(n))))
+        rng = np.random.default_rng(seed)
+        sample = encodings[np.sort(rng.choice(n, min(n, n_lists * IVF_SAMPLE_PER_LIST), replace=False))]
+        sample = np.asarray(sample, dtype=np.float32)
+        centroids = sample[rng.choice(len(sample), n_lists, replace=False)].copy()
+        for _ in range(IVF_ITERS):
+            assign, _ = _nearest(sample, centroids)
+            counts = np.bincount(assign, minlength=n_lists)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assign, sample)
+            filled = counts > 0
+            centroids[filled] = sums[filled] / counts[filled, None]
+        assign, _ = _nearest(encodings, centroids)
+        self.centroids, self.c_norms = centroids, _sq_norms(centroids)
+        self.order = np.argsort(assign, kind="stable")
+        self.offsets = np.concatenate([[0], np.cumsum(np.bincount(assign, minlength=n_lists))])
+        self.n_probe = min(n_probe, n_lists)
+
+    def search(self, q, encodings, norms):
+        q_norms = _sq_norms(q)
+        to_centroids = q_norms[:, None] + self.c_norms[None, :] - 2.0 * (q @ self.centroids.T)
+        probes = np.argpartition(to_centroids, self.n_probe - 1, axis=1)[:, :self.n_probe]
+        best = np.full(len(q), -1, dtype=np.int64)
+        best_d2 = np.full(len(q), np.inf, dtype=np.float32)
+        for k, lists in enumerate(probes):
+            rows = np.concatenate([self.order[self.offsets[l]:self.offsets[l + 1]] for l in lists])
+            if not len(rows): continue
+            d2 = q_norms[k] + norms[rows] - 2.0 * (np.asarray(encodings[rows], dtype=np.float32) @ q[k])
+            i = d2.argmin()
+            best[k], best_d2[k] = rows[i], d2[i]
+        return best, np.sqrt(np.maximum(best_d2, 0))
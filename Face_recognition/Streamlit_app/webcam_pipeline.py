@@ -0,0 +1,228 @@
+import queue
+import threading
+import time
+from collections import deque
+
+import cv2
+import numpy as np
+
+# ---------------- WEBCAM PIPELINE ---------------- #
+DETECT_EVERY = 3        # run the detector on every Nth frame, track in between
+DETECT_SCALE = 0.25     # detector input is downscaled by this factor
+QUEUE_SIZE = 2          # frames waiting per stage; older frames are dropped
+IOU_MATCH = 0.3         # min overlap for a detection to continue a track
+MAX_MISSED = 2          # detection rounds a track survives without a match
+STATS_WINDOW = 60       # samples kept per stage for latency / FPS
+IDLE_TIMEOUT = 10.0     # seconds without a ``latest()`` call before the pipeline stops itself
+
+
+class StageStats:
+    """Rolling latency and throughput of one pipeline stage."""
+
+    def __init__(self, window=STATS_WINDOW):
+        self._lat, self._done = deque(maxlen=window), deque(maxlen=window)
+        self._lock = threading.Lock()
+        self.dropped = 0
+
+    def record(self, seconds):
+        with self._lock:
+            self._lat.append(seconds)
+            self._done.append(time.monotonic())
+
+    def snapshot(self):
+        with self._lock:
+            lat, done = list(self._lat), list(self._done)
+        fps = (len(done) - 1) / (done[-1] - done[0]) if len(done) > 1 and done[-1] > done[0] else 0.0
+        return {"fps": round(fps, 1), "latency_ms": round(1000 * float(np.mean(lat)), 1) if lat else 0.0,
+                "dropped": self.dropped}
+
+
+def _offer(q, item, stats=None):
+    """Put without blocking; when full, replace the oldest item so consumers see fresh frames."""
+    try:
+        q.put_nowait(item)
+    except queue.Full:
+        try: q.get_nowait()
+        except queue.Empty: pass
+        if stats: stats.dropped += 1
+        q.put_nowait(item)
+
+
+def iou(a, b):
+    top, right, bottom, left = max(a[0], b[0]), min(a[1], b[1]), min(a[2], b[2]), max(a[3], b[3])
+    inter = max(0.0, right - left) * max(0.0, bottom - top)
+    area = lambda r: (r[1] - r[3]) * (r[2] - r[0])
+    union = area(a) + area(b) - inter
+    return inter / union if union > 0 else 0.0
+
+
+class Track:
+    __slots__ = ("id", "box", "velocity", "name", "distance", "missed", "needs_encode", "inflight", "frame")
+
+    def __init__(self, track_id, box, frame):
+        self.id, self.box, self.frame = track_id, np.asarray(box, dtype=np.float32), frame
+        self.velocity = np.zeros(4, dtype=np.float32)
+        self.name, self.distance, self.missed = None, None, 0
+        self.needs_encode, self.inflight = True, False
+
+
+class FaceTracker:
+    """IoU tracker with constant-velocity prediction between detection rounds.
+
+    A track asks to be (re-)encoded when it is new, or when it is matched
+    again after missing a detection round; otherwise it keeps its identity.
+    """
+
+    def __init__(self):
+        self.tracks, self._next = {}, 0
+        self._lock = threading.Lock()
+
+    def update(self, boxes, frame):
+        """Match this round's detections; returns [(track id, box)] that need encoding."""
+        with self._lock:
+            pairs = sorted(((iou(t.box, b), tid, j) for tid, t in self.tracks.items() for j, b in enumerate(boxes)), reverse=True)
+            used_t, used_b = set(), set()
+            for overlap, tid, j in pairs:
+                if overlap < IOU_MATCH: break
+                if tid in used_t or j in used_b: continue
+                used_t.add(tid); used_b.add(j)
+                t = self.tracks[tid]
+                box = np.asarray(boxes[j], dtype=np.float32)
+                t.velocity = (box - t.box) / max(1, frame - t.frame)
+                if t.missed: t.needs_encode = True
+                t.box, t.frame, t.missed = box, frame, 0
+            for tid in list(self.tracks):
+                if tid in used_t: continue
+                t = self.tracks[tid]
+                t.missed += 1
+                if t.missed > MAX_MISSED: del self.tracks[tid]
+            for j, b in enumerate(boxes):
+                if j not in used_b:
+                    self.tracks[self._next] = Track(self._next, b, frame)
+                    self._next += 1
+            todo = [(t.id, t.box.round().astype(int)) for t in self.tracks.values()
+                    if t.needs_encode and not t.inflight and not t.missed]
+            for tid, _ in todo: self.tracks[tid].inflight = True
+            return todo
+
+    def predict(self, frame):
+        with self._lock:
+            for t in self.tracks.values():
+                steps = frame - t.frame
+                if steps > 0: t.box, t.frame = t.box + steps * t.velocity, frame
+
+    def identify(self, results):
+        """Store (track id, name, distance) results; tracks gone meanwhile are ignored."""
+        with self._lock:
+            for tid, name, distance in results:
+                t = self.tracks.get(tid)
+                if t: t.name, t.distance, t.needs_encode, t.inflight = name, distance, False, False
+
+    def release(self, track_ids):
+        with self._lock:
+            for tid in track_ids:
+                if tid in self.tracks: self.tracks[tid].inflight = False
+
+    def snapshot(self):
+        """[(top, right, bottom, left, label)] for drawing."""
+        with self._lock:
+            return [(*t.box.round().astype(int).tolist(), t.name or "...") for t in self.tracks.values() if not t.missed]
+
+
+class FacePipeline:
+    """Capture, detection and encoding threads joined by bounded queues.
+
+    Capture keeps only the freshest frames. Detection runs on a downscaled
+    copy every ``detect_every`` frames and the tracker carries boxes in
+    between; only new or re-found tracks are sent to the (full-resolution)
+    encoder, which matches them against the gallery in one batch.
+
+    ``latest()`` doubles as a heartbeat: when nobody has polled for
+    ``idle_timeout`` seconds (the session went away), the threads stop and
+    release the camera.
+    """
+
+    def __init__(self, gallery, source=0, detect_every=DETECT_EVERY, scale=DETECT_SCALE, queue_size=QUEUE_SIZE,
+                 idle_timeout=IDLE_TIMEOUT):
+        self.gallery, self.source, self.idle_timeout = gallery, source, idle_timeout
+        self.settings = (detect_every, scale)
+        self.detect_every, self.scale = max(1, detect_every), scale
+        self.frames = queue.Queue(maxsize=queue_size)
+        self.to_encode = queue.Queue(maxsize=queue_size)
+        self.tracker = FaceTracker()
+        self.stages = {name: StageStats() for name in ("capture", "detect", "encode", "display")}
+        self.error = None
+        self._latest, self._latest_lock = None, threading.Lock()
+        self._polled = time.monotonic()
+        self._stop = threading.Event()
+        self._threads = [threading.Thread(target=fn, name=f"face-{fn.__name__[1:]}", daemon=True)
+                         for fn in (self._capture, self._detect, self._encode)]
+
+    def start(self):
+        self._polled = time.monotonic()
+        for t in self._threads: t.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        for t in self._threads: t.join(timeout=2)
+
+    def _capture(self):
+        camera = cv2.VideoCapture(self.source)
+        n = 0
+        try:
+            while not self._stop.is_set():
+                if time.monotonic() - self._polled > self.idle_timeout:
+                    self.error = "Webcam stopped: no viewer"
+                    self._stop.set()
+                    break
+                start = time.perf_counter()
+                ok, frame = camera.read()
+                if not ok:
+                    self.error = "Webcam not working"
+                    break
+                self.stages["capture"].record(time.perf_counter() - start)
+                _offer(self.frames, (n, frame), self.stages["capture"])
+                n += 1
+        finally:
+            camera.release()
+
+    def _detect(self):
+        import face_recognition
+        while not self._stop.is_set():
+            try: n, frame = self.frames.get(timeout=0.1)
+            except queue.Empty: continue
+            start = time.perf_counter()
+            rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+            if n % self.detect_every == 0:
+                small = cv2.resize(rgb, (0, 0), fx=self.scale, fy=self.scale)
+                boxes = [tuple(v / self.scale for v in loc) for loc in face_recognition.face_locations(small)]
+                todo = self.tracker.update(boxes, n)
+                if todo:
+                    try: self.to_encode.put_nowait((rgb, todo))
+                    except queue.Full: self.tracker.release([tid for tid, _ in todo])  # retried next round
+            else:
+                self.tracker.predict(n)
+            with self._latest_lock: self._latest = (n, rgb, self.tracker.snapshot())
+            self.stages["detect"].record(time.perf_counter() - start)
+
+    def _encode(self):
+        import face_recognition
+        while not self._stop.is_set():
+            try: rgb, todo = self.to_encode.get(timeout=0.1)
+            except queue.Empty: continue
+            start = time.perf_counter()
+            h, w = rgb.shape[:2]
+            boxes = [(max(0, t), min(w, r), min(h, b), max(0, l)) for _, (t, r, b, l) in todo]
+            encodings = face_recognition.face_encodings(rgb, boxes)
+            matches = self.gallery.match(encodings)
+            self.tracker.identify([(tid, name, dist) for (tid, _), (name, dist) in zip(todo, matches)])
+            self.stages["encode"].record(time.perf_counter() - start)
+
+    def latest(self):
+        """(frame number, RGB frame, [(top, right, bottom, left, label)]) or None before the first frame."""
+        self._polled = time.monotonic()
+        with self._latest_lock: return self._latest
+
+    def stats(self):
+        return {name: s.snapshot() for name, s in self.stages.items()}
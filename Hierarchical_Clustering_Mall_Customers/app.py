@@ -3,6 +3,7 @@ import streamlit as st
 import pandas as pd
 import joblib
 import matplotlib.pyplot as plt
+from segmentation import dataset_key, feature_frame, load_or_fit
 
 st.set_page_config(page_title="Mall Customer Segmentation")
 
@@ -12,7 +13,17 @@ st.write("Hierarchical Clustering – Customer Groups")
 # Load model
 BASE_DIR = os.path.dirname(__file__)
 MODEL_PATH = os.path.join(BASE_DIR, "hierarchical_mall_customer.pkl")
-model = joblib.load(MODEL_PATH)
+
+@st.cache_resource
+def load_model():
+    return joblib.load(MODEL_PATH)
+
+model = load_model()
+
+# Clustered once per reference dataset (keyed by its content hash); new customers only need the centroids
+@st.cache_resource(max_entries=8)
+def get_segmentation(key, _X):
+    return load_or_fit(model, _X)
 
 # Cluster meaning
 cluster_names = {
@@ -37,11 +48,11 @@ if uploaded_file is not None:
         errors="ignore"
     )
 
-    X = df_clean.select_dtypes(include=["int64", "float64"])
+    X = feature_frame(df_clean)
 
     # Clustering
-    clusters = model.fit_predict(X)
-    df_clean["Cluster"] = clusters
+    segmentation = get_segmentation(dataset_key(X, model), X)
+    df_clean["Cluster"] = segmentation.labels
     df_clean["Customer Type"] = df_clean["Cluster"].map(cluster_names)
 
     st.subheader("📊 Clustered Customers")
@@ -77,15 +88,29 @@ if uploaded_file is not None:
             ]
         )
 
-        temp_data = pd.concat([X, new_customer], ignore_index=True)
-        temp_clusters = model.fit_predict(temp_data)
-
-        cluster_id = temp_clusters[-1]
+        cluster_id = segmentation.assign(new_customer)[0]
         customer_type = cluster_names.get(
             cluster_id, "Unknown Customer Group"
         )
 
         st.success(f"🟢 Customer Type: {customer_type}")
 
+    # -------- BATCH SCORING ----------
+    st.subheader("📂 Score New Customers (CSV)")
+    new_file = st.file_uploader("Upload New Customers CSV", type=["csv"], key="new_customers")
+
+    if new_file is not None:
+        try:
+            scored = segmentation.assign_frame(pd.read_csv(new_file), cluster_names)
+            st.dataframe(scored.head(100))
+            st.download_button(
+                "📥 Download Segments",
+                scored.to_csv(index=False).encode("utf-8"),
+                file_name="customer_segments.csv",
+                mime="text/csv"
+            )
+        except KeyError as e:
+            st.error(f"Missing column: {e}")
+
 else:
     st.info("Please upload the Mall Customers CSV file.")
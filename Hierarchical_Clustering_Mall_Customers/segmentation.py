@@ -0,0 +1,103 @@
+"""Cluster the reference customers once, then assign new ones to the nearest centroid.
+
+Usage: python segmentation.py reference.csv new_customers.csv out.csv
+
+Agglomerative clustering has no ``predict``: it is O(n^2) and only labels
+the rows it was fitted on. Here it runs once per reference dataset; the
+per-cluster centroids are cached (in memory and on disk under ``CACHE_DIR``)
+keyed by the dataset's content hash, and a new customer is assigned to
+the closest of the k centroids.
+"""
+import argparse
+import hashlib
+import os
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+DROP_COLUMNS = ["CustomerID", "Genre", "Gender"]
+CACHE_DIR = os.environ.get("MALL_SEGMENT_CACHE", os.path.join(tempfile.gettempdir(), "mall_segments"))
+
+
+def feature_frame(df):
+    """The numeric columns the app clusters on (IDs and gender dropped)."""
+    return df.drop(columns=DROP_COLUMNS, errors="ignore").select_dtypes(include=["int64", "float64"])
+
+
+def dataset_key(X, model=None):
+    h = hashlib.blake2b(digest_size=16)
+    h.update("\0".join(X.columns).encode("utf-8"))
+    h.update(np.ascontiguousarray(X.to_numpy(dtype=np.float64)).tobytes())
+    if model is not None: h.update(repr(sorted(model.get_params().items())).encode("utf-8"))
+    return h.hexdigest()
+
+
+class Segmentation:
+    """Reference labels plus one centroid per cluster; ``assign`` costs O(k) per customer."""
+
+    def __init__(self, columns, centroids, cluster_ids, labels):
+        self.columns, self.centroids, self.cluster_ids, self.labels = list(columns), centroids, cluster_ids, labels
+
+    @classmethod
+    def fit(cls, model, X):
+        from sklearn.base import clone
+        labels = clone(model).fit_predict(X)
+        ids = np.unique(labels)
+        values = X.to_numpy(dtype=np.float64)
+        centroids = np.stack([values[labels == c].mean(axis=0) for c in ids])
+        return cls(X.columns, centroids, ids, labels)
+
+    def save(self, path):
+        np.savez(path, columns=np.array(self.columns), centroids=self.centroids, cluster_ids=self.cluster_ids,
+                 labels=self.labels)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls([str(c) for c in data["columns"]], data["centroids"], data["cluster_ids"], data["labels"])
+
+    def assign(self, X):
+        """Cluster id of the nearest centroid for each row of ``X`` (same columns as the reference)."""
+        values = np.asarray(X[self.columns], dtype=np.float64)
+        d2 = ((values[:, None, :] - self.centroids[None, :, :]) ** 2).sum(axis=2)
+        return self.cluster_ids[d2.argmin(axis=1)]
+
+    def assign_frame(self, df, names=None):
+        """``df`` with ``Cluster`` (and ``Customer Type`` if ``names`` given) for a whole CSV of customers."""
+        out = df.copy()
+        out["Cluster"] = self.assign(df)
+        if names is not None: out["Customer Type"] = out["Cluster"].map(names)
+        return out
+
+
+def load_or_fit(model, X, cache_dir=CACHE_DIR):
+    """Segmentation for ``X``, from the disk cache when this dataset and model were clustered before."""
+    path = os.path.join(cache_dir, dataset_key(X, model) + ".npz")
+    if os.path.exists(path): return Segmentation.load(path)
+    seg = Segmentation.fit(model, X)
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        seg.save(path)
+    except OSError:
+        pass  # read-only deploys just keep the in-memory result
+    return seg
+
+
+def main():
+    import joblib
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("reference")
+    parser.add_argument("customers")
+    parser.add_argument("out")
+    parser.add_argument("--model", default=os.path.join(base_dir, "hierarchical_mall_customer.pkl"))
+    args = parser.parse_args()
+    seg = load_or_fit(joblib.load(args.model), feature_frame(pd.read_csv(args.reference)))
+    scored = seg.assign_frame(pd.read_csv(args.customers))
+    scored.to_csv(args.out, index=False)
+    print(f"assigned {len(scored)} customers to {len(seg.cluster_ids)} clusters -> {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,12 @@
 import streamlit as st
-import librosa
 import numpy as np
-import pickle
+import pandas as pd
 import os
 import matplotlib.pyplot as plt
 import io
 from datetime import datetime
+from mood_ai import load_recommender
+from audio_engine import text_to_song, pyin_track, stream_voice_to_music, stream_to_wav, DecodeCache, PitchShifter
 
 # --- 1. PAGE CONFIGURATION ---
 st.set_page_config(
@@ -25,20 +26,25 @@ if 'pred_genre' not in st.session_state:
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 
 @st.cache_resource
-def load_models():
-    nb_path = os.path.join(BASE_DIR, 'nb_task.pkl')
-    knn_path = os.path.join(BASE_DIR, 'knn_music.pkl')
-    enc_path = os.path.join(BASE_DIR, 'encoders.pkl')
-    if os.path.exists(nb_path) and os.path.exists(knn_path) and os.path.exists(enc_path):
-        try:
-            with open(nb_path, 'rb') as f: nb_model = pickle.load(f)
-            with open(knn_path, 'rb') as f: knn_model = pickle.load(f)
-            with open(enc_path, 'rb') as f: encoders = pickle.load(f)
-            return nb_model, knn_model, encoders, True
-        except: return None, None, None, False
-    else: return None, None, None, False
-
-nb_model, knn_model, encoders, is_ml_ready = load_models()
+def get_recommender():
+    # Encoder lookups are built once; None when the pickles are missing
+    return load_recommender(BASE_DIR)
+
+recommender = get_recommender()
+is_ml_ready = recommender is not None
+
+@st.cache_resource
+def get_decode_cache():
+    return DecodeCache()
+
+def load_upload(upload, sr=22050):
+    # Decoded once per (content, sample rate); widget reruns hit the cache
+    return get_decode_cache().decode(upload, sr)
+
+@st.cache_resource(max_entries=4)
+def get_pitch_shifter(content_key, sr, _y, prerender=()):
+    # STFT once per clip; every n_steps after that reuses it
+    return PitchShifter(_y, sr).prerender(prerender)
 
 # --- 4. ADVANCED CSS (PINK SIDEBAR & NEON THEME) ---
 st.markdown("""
@@ -70,8 +76,7 @@ st.markdown("""
 
 def voice_to_music(audio, sr):
     hop_length = 512
-    f0, _, _ = librosa.pyin(audio, fmin=librosa.note_to_hz('C2'), fmax=librosa.note_to_hz('C7'), hop_length=hop_length)
-    f0 = np.nan_to_num(f0)
+    f0 = pyin_track(audio, sr, hop_length)
     f0_stretched = np.repeat(f0, hop_length)
     if len(f0_stretched) < len(audio): f0_stretched = np.pad(f0_stretched, (0, len(audio) - len(f0_stretched)))
     else: f0_stretched = f0_stretched[:len(audio)]
@@ -80,19 +85,17 @@ def voice_to_music(audio, sr):
     max_val = np.max(np.abs(music))
     return music / max_val if max_val > 0 else music
 
+STREAM_MIN_SEC = 120  # longer clips are tracked block by block and streamed to a WAV
+
+def play_voice_to_music(audio, sr):
+    if len(audio) < STREAM_MIN_SEC * sr:
+        st.audio(voice_to_music(audio, sr), sample_rate=sr); return
+    bar = st.progress(0.0, text="🎼 Streaming melody synthesis...")
+    st.audio(stream_to_wav(stream_voice_to_music(audio, sr), sr, total=len(audio), on_progress=bar.progress))
+
 def text_to_song_logic(text):
-    sr = 44100
-    words = text.split()
-    note_dur = 0.5
-    full_song = np.array([])
-    scale = [261.63, 293.66, 329.63, 392.00, 440.00, 523.25] # Pentatonic
-    for word in words:
-        freq = scale[len(word) % len(scale)]
-        t = np.linspace(0, note_dur, int(sr * note_dur))
-        envelope = np.exp(-3 * t / note_dur) 
-        note = 0.5 * np.sin(2 * np.pi * freq * t) * envelope
-        full_song = np.concatenate([full_song, note])
-    return full_song, sr
+    # Pre-rendered note bank, one gather into a single output buffer
+    return text_to_song(text)
 
 # --- 6. SIDEBAR NAVIGATION ---
 with st.sidebar:
@@ -129,11 +132,7 @@ elif "Mood AI" in choice:
         u_act = st.selectbox("Activity:", ["Studying", "Coding", "Workout", "Relaxing", "Sleeping"])
         if st.button("🚀 PREDICT & SUGGEST"):
             if is_ml_ready:
-                m_enc = encoders['le_mood'].transform([u_mood])[0]
-                a_enc = encoders['le_activity'].transform([u_act])[0]
-                X = np.array([[m_enc, a_enc, datetime.now().hour, 0]])
-                st.session_state.pred_task = encoders['le_task'].inverse_transform(nb_model.predict(X))[0]
-                st.session_state.pred_genre = encoders['le_music'].inverse_transform(knn_model.predict(X))[0]
+                st.session_state.pred_task, st.session_state.pred_genre = recommender.recommend(u_mood, u_act, datetime.now().hour)
             else:
                 st.session_state.pred_task = "Focus Session"; st.session_state.pred_genre = "Lo-Fi"
             st.balloons(); st.snow()
@@ -144,6 +143,21 @@ elif "Mood AI" in choice:
             search_url = f"https://open.spotify.com/search/{genre_search_map.get(genre, 'lofi').replace(' ', '%20')}"
             st.markdown(f"<div class='glass-card' style='text-align:center; border: 2px solid #1DB954;'><h3>🎧 Recommendation</h3><p><b>Task:</b> {st.session_state.pred_task}</p><p><b>Music:</b> {genre}</p><br><a href='{search_url}' target='_blank'><button style='background:linear-gradient(45deg,#1DB954,#1ed760); color:white; padding:15px 30px; border:none; border-radius:50px; font-weight:800; cursor:pointer;'>🔗 OPEN IN SPOTIFY</button></a></div>", unsafe_allow_html=True)
 
+    # Batch mode: score a whole user list in one pass over both models
+    with st.expander("📂 Batch Recommendations (CSV)"):
+        st.caption("Columns: Mood, Activity and optionally Hour (0–23; defaults to the current hour)")
+        users_file = st.file_uploader("Upload users CSV:", type=["csv"], key="mood_batch")
+        if users_file and is_ml_ready:
+            try:
+                scored = recommender.recommend_batch(pd.read_csv(users_file))
+                st.dataframe(scored.head(1000))
+                st.download_button("📥 DOWNLOAD RECOMMENDATIONS", scored.to_csv(index=False).encode("utf-8"),
+                                   file_name="recommendations.csv", mime="text/csv")
+            except KeyError as e:
+                st.error(f"Missing column: {e}")
+        elif users_file:
+            st.error("⚠️ ML CORE MISSING")
+
 # --- CREATIVE STUDIO (3-IN-1) ---
 elif "Creative Studio" in choice:
     st.markdown("<div class='glass-card'><h3>🎙️ Creative AI Studio</h3></div>", unsafe_allow_html=True)
@@ -151,13 +165,13 @@ elif "Creative Studio" in choice:
     with tab1:
         v = st.audio_input("Record voice to convert:")
         if v and st.button("✨ TRANSFORM RECORDING"):
-            y, sr = librosa.load(v); processed = voice_to_music(y, sr)
-            st.audio(processed, sample_rate=sr); st.balloons()
+            y, sr = load_upload(v); play_voice_to_music(y, sr)
+            st.balloons()
     with tab2:
         up = st.file_uploader("Upload Audio (MP3/WAV):", type=["mp3","wav"])
         if up and st.button("🚀 TRANSFORM UPLOAD"):
-            y, sr = librosa.load(up); processed = voice_to_music(y, sr)
-            st.audio(processed, sample_rate=sr); st.balloons()
+            y, sr = load_upload(up); play_voice_to_music(y, sr)
+            st.balloons()
     with tab3:
         lyrics = st.text_area("Input Lyrics (e.g., Kanguva lyrics):")
         if lyrics and st.button("🎵 GENERATE THEME"):
@@ -169,10 +183,12 @@ elif "Hearing Assist" in choice:
     st.markdown("<div class='glass-card'><h3>♿ Inclusive Hearing Assist</h3><p>Optimizing sound frequencies for vibrations.</p></div>", unsafe_allow_html=True)
     up_h = st.file_uploader("Upload audio for frequency shift", type=["mp3", "wav"])
     if up_h:
-        y, sr = librosa.load(up_h)
+        y, sr = load_upload(up_h)
+        # All 13 slider positions render in the background as soon as the clip loads
+        shifter = get_pitch_shifter(DecodeCache.content_key(up_h.getvalue()), sr, y, tuple(range(-12, 1)))
         shift = st.slider("Frequency Sensitivity (Lower pitch = more vibration)", -12, 0, -8)
         if st.button("🔊 OPTIMIZE Pattern"):
             st.snow()
-            y_shift = librosa.effects.pitch_shift(y, sr=sr, n_steps=shift)
+            y_shift = shifter.shift(shift)
             st.audio(y_shift * 1.5, sample_rate=sr)
             st.success("Sound optimized for Earspots.")
@@ -0,0 +1,290 @@
+import os
+
+import numpy as np
+
+# --- TEXT-TO-SONG SYNTHESIS ---
+SONG_SR = 44100
+NOTE_DUR = 0.5
+SCALE = [261.63, 293.66, 329.63, 392.00, 440.00, 523.25]  # Pentatonic
+
+
+class NoteBank:
+    """One pre-rendered, decayed sine note per scale frequency.
+
+    Rendering a lyric is a single gather from the bank into one
+    preallocated buffer, so cost is linear in the number of words.
+    """
+
+    def __init__(self, scale=SCALE, sr=SONG_SR, note_dur=NOTE_DUR, dtype=np.float32):
+        self.sr = sr
+        self.scale = np.asarray(scale, dtype=np.float64)
+        self.note_len = int(sr * note_dur)
+        t = np.linspace(0, note_dur, self.note_len)
+        envelope = np.exp(-3 * t / note_dur)
+        self.bank = (0.5 * np.sin(2 * np.pi * self.scale[:, None] * t) * envelope).astype(dtype)
+
+    def note_indices(self, words):
+        lengths = np.fromiter((len(w) for w in words), dtype=np.intp, count=len(words))
+        return lengths % len(self.scale)
+
+    def render(self, text, out=None):
+        idx = self.note_indices(text.split())
+        if out is None:
+            out = np.empty(len(idx) * self.note_len, dtype=self.bank.dtype)
+        np.take(self.bank, idx, axis=0, out=out[:len(idx) * self.note_len].reshape(len(idx), self.note_len))
+        return out, self.sr
+
+
+_NOTE_BANK = None
+
+def get_note_bank():
+    global _NOTE_BANK
+    if _NOTE_BANK is None: _NOTE_BANK = NoteBank()
+    return _NOTE_BANK
+
+def text_to_song(text):
+    return get_note_bank().render(text)
+
+
+# --- STREAMING VOICE-TO-MUSIC ---
+PYIN_HOP = 512
+PYIN_FMIN = 65.40639132514966   # C2
+PYIN_FMAX = 2093.004522404789   # C7
+BLOCK_FRAMES = 1024             # ~24 s of pitch frames per block at 22.05 kHz
+CONTEXT_FRAMES = 64             # frames of overlap on each side so pyin's HMM settles
+_x = np.linspace(0, 2 * np.pi, 4096)
+SYNTH_PEAK = float(np.max(0.5 * np.sin(_x) + 0.2 * np.sin(2 * _x)))
+
+
+def track_pitch(audio, sr, hop_length=PYIN_HOP):
+    import librosa
+    f0, _, _ = librosa.pyin(audio, fmin=PYIN_FMIN, fmax=PYIN_FMAX, sr=sr, hop_length=hop_length)
+    return np.nan_to_num(f0)
+
+
+def frame_segments(n_samples, hop_length, block_frames, context_frames):
+    """Split a signal into frame-aligned pyin segments with overlap.
+
+    Yields ``(a, b, left, seg_start, seg_end)``: the segment's samples
+    ``[seg_start, seg_end)`` cover global frames ``a - left`` onwards, and
+    frames ``[a, b)`` are the ones to keep from it.
+    """
+    total_frames = 1 + n_samples // hop_length
+    for a in range(0, total_frames, block_frames):
+        b = min(a + block_frames, total_frames)
+        left = min(context_frames, a)
+        yield a, b, left, (a - left) * hop_length, min((b + context_frames) * hop_length, n_samples)
+
+
+# --- PARALLEL PYIN ---
+MIN_SEGMENT_FRAMES = 256        # below this the context overhead outweighs the extra cores
+PARALLEL_MIN_SEC = 20
+_PITCH_POOL = None
+
+def get_pitch_pool(workers=None):
+    global _PITCH_POOL
+    if _PITCH_POOL is None:
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor
+        # spawn, not fork: the Streamlit server process is multi-threaded
+        _PITCH_POOL = ProcessPoolExecutor(max_workers=workers or os.cpu_count(),
+                                          mp_context=multiprocessing.get_context("spawn"))
+    return _PITCH_POOL
+
+
+def parallel_pyin(audio, sr, hop_length=PYIN_HOP, workers=None, context_frames=CONTEXT_FRAMES,
+                  tracker=track_pitch, pool=None):
+    """pyin over frame-aligned overlapping segments on a process pool.
+
+    The stitched track has the same length as a single ``track_pitch`` call
+    and matches it except for rare voicing flips near segment joins.
+    """
+    workers = workers or os.cpu_count() or 1
+    total_frames = 1 + len(audio) // hop_length
+    block = max(MIN_SEGMENT_FRAMES, -(-total_frames // workers))
+    if workers == 1 or block >= total_frames: return tracker(audio, sr, hop_length)
+    pool = pool or get_pitch_pool(workers)
+    segments = list(frame_segments(len(audio), hop_length, block, context_frames))
+    futures = [pool.submit(tracker, np.ascontiguousarray(audio[s0:s1]), sr, hop_length) for _, _, _, s0, s1 in segments]
+    f0 = np.empty(total_frames, dtype=np.float64)
+    for (a, b, left, _, _), fut in zip(segments, futures):
+        f0[a:b] = fut.result()[left:left + b - a]
+    return f0
+
+
+def pyin_track(audio, sr, hop_length=PYIN_HOP):
+    """Single-core pyin for short clips, the process pool for long ones."""
+    if len(audio) < PARALLEL_MIN_SEC * sr or (os.cpu_count() or 1) < 2: return track_pitch(audio, sr, hop_length)
+    return parallel_pyin(audio, sr, hop_length)
+
+
+def synth_block(f0, n_samples, sr, hop_length=PYIN_HOP, phase0=0.0):
+    """Sine + octave synthesis for one block; returns (chunk, end_phase)."""
+    f0_stretched = np.repeat(f0.astype(np.float64), hop_length)[:n_samples]
+    if len(f0_stretched) < n_samples: f0_stretched = np.pad(f0_stretched, (0, n_samples - len(f0_stretched)))
+    phase = np.cumsum(f0_stretched * (2 * np.pi / sr))
+    phase += phase0
+    music = (0.5 * np.sin(phase) + 0.2 * np.sin(2 * phase)).astype(np.float32)
+    end_phase = float(phase[-1] % (2 * np.pi)) if n_samples else phase0
+    return music, end_phase
+
+
+def stream_voice_to_music(audio, sr, hop_length=PYIN_HOP, block_frames=BLOCK_FRAMES,
+                          context_frames=CONTEXT_FRAMES, tracker=pyin_track):
+    """Yield voice-to-music chunks block by block.
+
+    Each block runs pyin over its frames plus ``context_frames`` on both
+    sides and keeps only the centre, so working memory depends on the block
+    size rather than the clip length. ``audio`` only needs slicing, so an
+    np.memmap works. Output is scaled by the synth's fixed peak instead of
+    the clip-wide maximum.
+    """
+    n = len(audio)
+    phase = 0.0
+    for a, b, left, seg_start, seg_end in frame_segments(n, hop_length, block_frames, context_frames):
+        f0 = tracker(np.ascontiguousarray(audio[seg_start:seg_end]), sr, hop_length)[left:left + b - a]
+        start, stop = a * hop_length, min(b * hop_length, n)
+        chunk, phase = synth_block(f0, stop - start, sr, hop_length, phase)
+        chunk /= SYNTH_PEAK
+        yield chunk
+
+
+def stream_to_wav(chunks, sr, path=None, total=None, on_progress=None, subtype="FLOAT"):
+    """Write float32 chunks to a WAV (``subtype`` encoding) as they arrive.
+
+    Returns ``path``, or when none is given a rewound BytesIO holding the
+    whole WAV, so nothing is left behind on disk once the caller is done.
+    """
+    import io
+    import soundfile as sf
+    target = io.BytesIO() if path is None else path
+    done = 0
+    with sf.SoundFile(target, "w", samplerate=sr, channels=1, subtype=subtype, format="WAV") as out:
+        for chunk in chunks:
+            out.write(chunk); done += len(chunk)
+            if on_progress and total: on_progress(min(done / total, 1.0))
+    if path is None: target.seek(0)
+    return target
+
+
+# --- DECODED UPLOAD CACHE ---
+DECODE_CACHE_BYTES = 512 * 1024 * 1024
+
+
+def librosa_decode(data, sr):
+    import io
+    import librosa
+    return librosa.load(io.BytesIO(data), sr=sr)
+
+
+class DecodeCache:
+    """LRU of decoded float32 audio keyed by (content hash, sample rate).
+
+    Shared by every session of the app, so widget reruns and repeat
+    uploads never decode or resample the same bytes twice. Cached arrays
+    are read-only; copy before modifying in place.
+    """
+
+    def __init__(self, max_bytes=DECODE_CACHE_BYTES):
+        import threading
+        from collections import OrderedDict
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def content_key(data):
+        import hashlib
+        return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+    def decode(self, source, sr=22050, loader=librosa_decode):
+        """Return ``(y, sr)`` for raw bytes or a Streamlit UploadedFile."""
+        data = source.getvalue() if hasattr(source, "getvalue") else bytes(source)
+        key = (self.content_key(data), sr)
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key]
+        y, sr_out = loader(data, sr)
+        y = np.ascontiguousarray(y, dtype=np.float32)
+        y.flags.writeable = False
+        entry = (y, sr_out)
+        if y.nbytes > self.max_bytes: return entry
+        with self._lock:
+            if key not in self._entries:
+                self._entries[key] = entry
+                self.nbytes += y.nbytes
+            while self.nbytes > self.max_bytes:
+                _, (old, _) = self._entries.popitem(last=False)
+                self.nbytes -= old.nbytes
+        return entry
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear(); self.nbytes = 0
+
+
+# --- PITCH SHIFT ENGINE ---
+SHIFT_N_FFT = 2048
+SHIFT_HOP = 512
+_RENDER_POOL = None
+
+def get_render_pool():
+    global _RENDER_POOL
+    if _RENDER_POOL is None:
+        from concurrent.futures import ThreadPoolExecutor
+        _RENDER_POOL = ThreadPoolExecutor(max_workers=os.cpu_count() or 1, thread_name_prefix="pitch-shift")
+    return _RENDER_POOL
+
+
+class PitchShifter:
+    """librosa-equivalent pitch shifting that analyses the clip only once.
+
+    The STFT is computed at construction; each ``shift`` then only runs
+    the phase vocoder, inverse STFT and resample. Rendered variants are
+    kept, so repeat requests for the same ``n_steps`` are free, and
+    ``prerender`` fills them in on background threads.
+    """
+
+    def __init__(self, y, sr, n_fft=SHIFT_N_FFT, hop_length=SHIFT_HOP, bins_per_octave=12, res_type="soxr_hq"):
+        import librosa
+        import threading
+        self.y, self.sr = y, sr
+        self.n_fft, self.hop_length = n_fft, hop_length
+        self.bins_per_octave, self.res_type = bins_per_octave, res_type
+        self.stft = librosa.stft(y, n_fft=n_fft, hop_length=hop_length)
+        self._variants = {}
+        self._lock = threading.Lock()
+
+    def _render(self, n_steps):
+        import librosa
+        if n_steps == 0: return self.y
+        rate = 2.0 ** (-float(n_steps) / self.bins_per_octave)
+        stretched = librosa.phase_vocoder(self.stft, rate=rate, hop_length=self.hop_length, n_fft=self.n_fft)
+        y_stretch = librosa.istft(stretched, hop_length=self.hop_length, n_fft=self.n_fft,
+                                  dtype=self.y.dtype, length=int(round(len(self.y) / rate)))
+        y_shift = librosa.resample(y_stretch, orig_sr=float(self.sr) / rate, target_sr=self.sr, res_type=self.res_type)
+        y_shift = librosa.util.fix_length(y_shift, size=len(self.y))
+        y_shift.flags.writeable = False
+        return y_shift
+
+    def shift(self, n_steps):
+        from concurrent.futures import Future
+        with self._lock:
+            variant = self._variants.get(n_steps)
+            owner = variant is None
+            if owner: variant = self._variants[n_steps] = Future()
+        if owner:
+            try: variant.set_result(self._render(n_steps))
+            except Exception as e: variant.set_exception(e)
+        return variant.result()
+
+    def prerender(self, steps):
+        pool = get_render_pool()
+        for n_steps in steps: pool.submit(self.shift, n_steps)
+        return self
+
+    def is_ready(self, n_steps):
+        variant = self._variants.get(n_steps)
+        return variant is not None and variant.done()
@@ -2,17 +2,21 @@ import streamlit as st
 import librosa
 import librosa.display
 import numpy as np
-import pickle
+import pandas as pd
 import os
 import matplotlib.pyplot as plt
 import soundfile as sf
 import tempfile
 import time
-import requests
 import io
 from datetime import datetime
 from streamlit_lottie import st_lottie
 from pydub import AudioSegment
+from mood_ai import load_recommender
+from audio_engine import text_to_song, pyin_track, stream_voice_to_music, stream_to_wav, DecodeCache, PitchShifter
+from assets import LottieAssets
+from mixer import mix_files
+from voice_morph import MORPH_PRESETS, MORPH_STEPS, morph
 
 
 st.set_page_config(
@@ -22,15 +26,13 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-def load_lottieurl(url):
-    try:
-        r = requests.get(url, timeout=5)
-        if r.status_code != 200: return None
-        return r.json()
-    except: return None
+@st.cache_resource
+def get_lottie_assets():
+    # Fetched concurrently in the background, cached on disk, bundled JSON as fallback
+    return LottieAssets()
 
-lottie_ai = load_lottieurl("https://lottie.host/804d9c75-3432-4770-8777-628f800c01a5/eH6F1X9K3L.json") 
-lottie_music = load_lottieurl("https://lottie.host/83e0e788-779d-4033-9092-22538965873a/vX6yUf0wV8.json")
+lottie_ai = get_lottie_assets().get("ai")
+lottie_music = get_lottie_assets().get("music")
 
 
 if 'pred_task' not in st.session_state: st.session_state.pred_task = None
@@ -40,20 +42,25 @@ if 'bpm_val' not in st.session_state: st.session_state.bpm_val = 0
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 @st.cache_resource
-def load_models():
-    nb_path = os.path.join(BASE_DIR, 'nb_task.pkl')
-    knn_path = os.path.join(BASE_DIR, 'knn_music.pkl')
-    enc_path = os.path.join(BASE_DIR, 'encoders.pkl')
-    if os.path.exists(nb_path) and os.path.exists(knn_path) and os.path.exists(enc_path):
-        try:
-            with open(nb_path, 'rb') as f: nb_model = pickle.load(f)
-            with open(knn_path, 'rb') as f: knn_model = pickle.load(f)
-            with open(enc_path, 'rb') as f: encoders = pickle.load(f)
-            return nb_model, knn_model, encoders, True
-        except: return None, None, None, False
-    else: return None, None, None, False
-
-nb_model, knn_model, encoders, is_ml_ready = load_models()
+def get_recommender():
+    # Encoder lookups are built once; None when the pickles are missing
+    return load_recommender(BASE_DIR)
+
+recommender = get_recommender()
+is_ml_ready = recommender is not None
+
+@st.cache_resource
+def get_decode_cache():
+    return DecodeCache()
+
+def load_upload(upload, sr=22050):
+    # Decoded once per (content, sample rate); widget reruns hit the cache
+    return get_decode_cache().decode(upload, sr)
+
+@st.cache_resource(max_entries=4)
+def get_pitch_shifter(content_key, sr, _y, prerender=()):
+    # STFT once per clip; every n_steps after that reuses it
+    return PitchShifter(_y, sr).prerender(prerender)
 
 
 st.markdown("""
@@ -96,29 +103,25 @@ st.markdown("""
 
 def voice_to_music(audio, sr):
     hop_length = 512
-    f0, _, _ = librosa.pyin(audio, fmin=librosa.note_to_hz('C2'), fmax=librosa.note_to_hz('C7'), hop_length=hop_length)
-    f0 = np.nan_to_num(f0)
+    f0 = pyin_track(audio, sr, hop_length)
     phase = np.cumsum(2 * np.pi * np.repeat(f0, hop_length)[:len(audio)] / sr)
     music = 0.5 * np.sin(phase) + 0.2 * np.sin(2 * phase)
     return music / np.max(np.abs(music)) if np.max(np.abs(music)) > 0 else music
 
-def voice_morpher(y, sr, effect):
-    if effect == "Child 👶": return librosa.effects.pitch_shift(y, sr=sr, n_steps=5)
-    if effect == "Villain 👿": return librosa.effects.pitch_shift(y, sr=sr, n_steps=-5)
-    if effect == "Robot 🤖": return np.clip(librosa.effects.pitch_shift(y, sr=sr, n_steps=2) * 1.5, -1, 1)
-    return y
+STREAM_MIN_SEC = 120  # longer clips are tracked block by block and streamed to a WAV
+
+def play_voice_to_music(audio, sr):
+    if len(audio) < STREAM_MIN_SEC * sr:
+        st.audio(voice_to_music(audio, sr), sample_rate=sr); return
+    bar = st.progress(0.0, text="🎼 Streaming melody synthesis...")
+    st.audio(stream_to_wav(stream_voice_to_music(audio, sr), sr, total=len(audio), on_progress=bar.progress))
+
+def voice_morpher(y, sr, effect, shifter=None):
+    if effect not in MORPH_PRESETS: return y
+    return morph(shifter or PitchShifter(y, sr), effect)
 
 def text_to_song_logic(text):
-    sr = 44100
-    words = text.split()
-    full_song = np.array([])
-    scale = [261.63, 293.66, 329.63, 392.00, 440.00, 523.25] 
-    for word in words:
-        freq = scale[len(word) % len(scale)]
-        t = np.linspace(0, 0.5, int(sr * 0.5))
-        note = 0.5 * np.sin(2 * np.pi * freq * t) * np.exp(-3 * t / 0.5)
-        full_song = np.concatenate([full_song, note])
-    return full_song, sr
+    return text_to_song(text)
 
 
 with st.sidebar:
@@ -164,11 +167,7 @@ elif choice == "🧠 Mood AI (ML)":
         u_act = st.selectbox("Activity:", ["Studying", "Coding", "Workout", "Relaxing", "Sleeping"])
         if st.button("🚀 PREDICT & SUGGEST"):
             if is_ml_ready:
-                m_enc = encoders['le_mood'].transform([u_mood])[0]
-                a_enc = encoders['le_activity'].transform([u_act])[0]
-                X = np.array([[m_enc, a_enc, datetime.now().hour, 0]])
-                st.session_state.pred_task = encoders['le_task'].inverse_transform(nb_model.predict(X))[0]
-                st.session_state.pred_genre = encoders['le_music'].inverse_transform(knn_model.predict(X))[0]
+                st.session_state.pred_task, st.session_state.pred_genre = recommender.recommend(u_mood, u_act, datetime.now().hour)
             else:
                 st.session_state.pred_task = "Focus Session"; st.session_state.pred_genre = "Lo-Fi"
             st.balloons(); st.snow()
@@ -194,6 +193,21 @@ elif choice == "🧠 Mood AI (ML)":
                 </div>
             """, unsafe_allow_html=True)
 
+    # Batch mode: score a whole user list in one pass over both models
+    with st.expander("📂 Batch Recommendations (CSV)"):
+        st.caption("Columns: Mood, Activity and optionally Hour (0–23; defaults to the current hour)")
+        users_file = st.file_uploader("Upload users CSV:", type=["csv"], key="mood_batch")
+        if users_file and is_ml_ready:
+            try:
+                scored = recommender.recommend_batch(pd.read_csv(users_file))
+                st.dataframe(scored.head(1000))
+                st.download_button("📥 DOWNLOAD RECOMMENDATIONS", scored.to_csv(index=False).encode("utf-8"),
+                                   file_name="recommendations.csv", mime="text/csv")
+            except KeyError as e:
+                st.error(f"Missing column: {e}")
+        elif users_file:
+            st.error("⚠️ ML CORE MISSING")
+
 
 elif choice == "🎨 Creative Studio":
     st.markdown("<div class='glass-card'><h3>🎨 Creative AI Studio</h3></div>", unsafe_allow_html=True)
@@ -201,15 +215,18 @@ elif choice == "🎨 Creative Studio":
     
     with tab1:
         v_m = st.file_uploader("Upload Voice to Morph:", type=["wav", "mp3"], key="morph")
-        eff = st.selectbox("Select Character Effect:", ["Child 👶", "Villain 👿", "Robot 🤖"])
+        eff = st.selectbox("Select Character Effect:", list(MORPH_PRESETS))
         if v_m and st.button("✨ APPLY MORPH"):
-            y, sr = librosa.load(v_m); morphed = voice_morpher(y, sr, eff)
+            y, sr = load_upload(v_m)
+            # One analysis renders every character, so switching effects is instant
+            shifter = get_pitch_shifter(DecodeCache.content_key(v_m.getvalue()), sr, y, MORPH_STEPS)
+            morphed = voice_morpher(y, sr, eff, shifter)
             st.audio(morphed, sample_rate=sr); st.success(f"{eff} Applied!")
             
     with tab2:
         v_rec = st.audio_input("Record voice to convert into music:")
         if v_rec and st.button("🚀 GENERATE MELODY"):
-            y, sr = librosa.load(v_rec); st.audio(voice_to_music(y, sr), sample_rate=sr)
+            y, sr = load_upload(v_rec); play_voice_to_music(y, sr)
             
     with tab3:
         lyrics_txt = st.text_area("Input Lyrics (to generate a theme):", placeholder="e.g., Kanguva, Leo, or your own poem...")
@@ -219,15 +236,21 @@ elif choice == "🎨 Creative Studio":
     with tab4:
         v_file = st.file_uploader("Your Voice (MP3):", type=["mp3"], key="v_mix")
         b_file = st.file_uploader("Background Music (MP3):", type=["mp3"], key="b_mix")
+        g1, g2, g3 = st.columns(3)
+        v_gain = g1.slider("Voice Gain:", 0.0, 2.0, 1.0, 0.05)
+        b_gain = g2.slider("BGM Gain:", 0.0, 1.0, 0.18, 0.01)
+        duck = g3.slider("Ducking:", 0.0, 1.0, 0.0, 0.05)
+        loop_bgm = st.checkbox("Loop BGM under the whole voice track")
         if v_file and b_file and st.button("🎚️ MIX RECORDING"):
-            v_d, sr = librosa.load(v_file); b_d, _ = librosa.load(b_file, sr=sr)
-            mix = v_d[:min(len(v_d), len(b_d))] + (b_d[:min(len(v_d), len(b_d))] * 0.18)
-            st.audio(mix, sample_rate=sr); st.success("Studio Mix Complete!")
+            # Mixed block by block from scratch memmaps; only the 16-bit result WAV is held in memory
+            bar = st.progress(0.0, text="🎚️ Mixing...")
+            mix_wav = mix_files(v_file, b_file, voice_gain=v_gain, bgm_gain=b_gain, loop_bgm=loop_bgm, duck=duck, on_progress=bar.progress)
+            st.audio(mix_wav); st.success("Studio Mix Complete!")
             
     with tab5:
         vis_up = st.file_uploader("Upload Audio for Visualization:", type=["mp3"], key="vis")
         if vis_up:
-            y, sr = librosa.load(vis_up); fig, ax = plt.subplots(figsize=(10, 3))
+            y, sr = load_upload(vis_up); fig, ax = plt.subplots(figsize=(10, 3))
             librosa.display.waveshow(y, sr=sr, ax=ax, color="#ff00c1")
             ax.set_facecolor('black'); fig.patch.set_facecolor('black'); st.pyplot(fig)
 
@@ -236,7 +259,8 @@ elif choice == "♿ Assist Mode":
     st.markdown("<div class='glass-card'><h3>♿ Hearing Assist</h3><p>Optimizing sound frequencies for enhanced tactile feedback (vibrations).</p></div>", unsafe_allow_html=True)
     h_up = st.file_uploader("Upload Audio:", type=["mp3", "wav"])
     if h_up and st.button("🔊 OPTIMIZE SOUND"):
-        y, sr = librosa.load(h_up); out = librosa.effects.pitch_shift(y, sr=sr, n_steps=-8)
+        y, sr = load_upload(h_up)
+        out = get_pitch_shifter(DecodeCache.content_key(h_up.getvalue()), sr, y).shift(-8)
         st.audio(out * 1.6, sample_rate=sr); st.info("Frequencies shifted for vibration sensitivity.")
 
 
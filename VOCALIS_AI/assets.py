@@ -0,0 +1,81 @@
+import json
+import os
+import tempfile
+import threading
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# --- LOTTIE ANIMATIONS ---
+LOTTIE_URLS = {
+    "ai": "https://lottie.host/804d9c75-3432-4770-8777-628f800c01a5/eH6F1X9K3L.json",
+    "music": "https://lottie.host/83e0e788-779d-4033-9092-22538965873a/vX6yUf0wV8.json",
+}
+BUNDLED_DIR = os.path.join(BASE_DIR, "lottie")
+BUNDLED_FALLBACK = "pulse.json"
+CACHE_DIR = os.environ.get("VOCALIS_ASSET_CACHE", os.path.join(tempfile.gettempdir(), "vocalis_lottie"))
+OFFLINE = os.environ.get("VOCALIS_OFFLINE", "") not in ("", "0")
+
+
+def _read_json(path):
+    try:
+        with open(path) as f: return json.load(f)
+    except (OSError, ValueError): return None
+
+
+class LottieAssets:
+    """Lottie animations served from memory, then disk, then bundled JSON.
+
+    ``get`` never touches the network. The first call starts one background
+    fetch per animation; fetched JSON is written to the disk cache and
+    replaces the in-memory copy, so a later rerun picks it up. In an
+    air-gapped deployment the fetches fail quietly and the bundled
+    animation keeps being served.
+    """
+
+    def __init__(self, urls=LOTTIE_URLS, cache_dir=CACHE_DIR, bundled_dir=BUNDLED_DIR, timeout=5, offline=OFFLINE):
+        self.urls, self.cache_dir, self.bundled_dir = urls, cache_dir, bundled_dir
+        self.timeout, self.offline = timeout, offline
+        self._mem = {}
+        self._lock = threading.Lock()
+        self._fetching = False
+
+    def _cache_path(self, name):
+        return os.path.join(self.cache_dir, f"{name}.json")
+
+    def _local(self, name):
+        return (_read_json(self._cache_path(name))
+                or _read_json(os.path.join(self.bundled_dir, f"{name}.json"))
+                or _read_json(os.path.join(self.bundled_dir, BUNDLED_FALLBACK)))
+
+    def get(self, name):
+        with self._lock:
+            if name not in self._mem: self._mem[name] = self._local(name)
+            data = self._mem[name]
+        self.prefetch()
+        return data
+
+    def prefetch(self):
+        with self._lock:
+            if self._fetching or self.offline: return
+            self._fetching = True
+        missing = [n for n in self.urls if not os.path.exists(self._cache_path(n))]
+        if missing:
+            from concurrent.futures import ThreadPoolExecutor
+            pool = ThreadPoolExecutor(max_workers=len(missing), thread_name_prefix="lottie")
+            for name in missing: pool.submit(self._fetch, name)
+            pool.shutdown(wait=False)
+
+    def _fetch(self, name):
+        try:
+            import requests
+            r = requests.get(self.urls[name], timeout=self.timeout)
+            if r.status_code != 200: return
+            data = r.json()
+        except Exception: return
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+            with os.fdopen(fd, "w") as f: json.dump(data, f)
+            os.replace(tmp, self._cache_path(name))
+        except OSError: pass
+        with self._lock: self._mem[name] = data
@@ -0,0 +1,61 @@
+"""Compare the NoteBank renderer with the original per-word concatenate loop.
+
+Usage: python benchmark_text_to_song.py [--words 10000] [--legacy-words 2000]
+"""
+import argparse
+import random
+import string
+import time
+
+import numpy as np
+
+from audio_engine import SCALE, SONG_SR, NOTE_DUR, NoteBank
+
+
+def legacy_text_to_song(text):
+    sr = SONG_SR
+    full_song = np.array([])
+    for word in text.split():
+        freq = SCALE[len(word) % len(SCALE)]
+        t = np.linspace(0, NOTE_DUR, int(sr * NOTE_DUR))
+        note = 0.5 * np.sin(2 * np.pi * freq * t) * np.exp(-3 * t / NOTE_DUR)
+        full_song = np.concatenate([full_song, note])
+    return full_song, sr
+
+
+def make_lyrics(n_words, seed=0):
+    rng = random.Random(seed)
+    return " ".join("".join(rng.choices(string.ascii_lowercase, k=rng.randint(1, 10))) for _ in range(n_words))
+
+
+def best_of(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter(); fn(); times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--words", type=int, default=10000)
+    parser.add_argument("--legacy-words", type=int, default=2000, help="the legacy loop is O(n^2), keep this small")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    bank = NoteBank()
+    small = make_lyrics(args.legacy_words)
+    ref, _ = legacy_text_to_song(small)
+    new, _ = bank.render(small)
+    print(f"max abs diff vs legacy: {np.max(np.abs(ref - new)) if len(ref) else 0.0:.2e}")
+
+    t_legacy = best_of(lambda: legacy_text_to_song(small), 1)
+    t_small = best_of(lambda: bank.render(small), args.repeat)
+    print(f"{args.legacy_words:>6} words  legacy: {t_legacy * 1e3:9.1f} ms   notebank: {t_small * 1e3:7.1f} ms   ({t_legacy / t_small:.0f}x)")
+
+    large = make_lyrics(args.words, seed=1)
+    t_large = best_of(lambda: bank.render(large), args.repeat)
+    print(f"{args.words:>6} words  notebank: {t_large * 1e3:7.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
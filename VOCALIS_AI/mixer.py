@@ -0,0 +1,124 @@
+import io
+import os
+import tempfile
+
+import numpy as np
+
+from audio_engine import stream_to_wav
+
+# --- CONSTANT-MEMORY BGM MIXER ---
+MIX_SR = 22050
+MIX_BLOCK = 1 << 18             # ~12 s per block at 22.05 kHz
+DECODE_BLOCK = 1 << 16
+DUCK_WINDOW = 2048
+DUCK_THRESHOLD = 0.05           # voice RMS at which ducking reaches full depth
+
+
+def _open_memmap(path, size, mode="w+"):
+    return np.memmap(path, dtype=np.float32, mode=mode, shape=(max(size, 1),))
+
+
+def decode_to_memmap(source, path, sr=MIX_SR):
+    """Decode ``source`` to a mono float32 memmap at ``sr``, block by block.
+
+    ``source`` may be a path, raw bytes or a Streamlit UploadedFile.
+    Resampling goes through a streaming soxr resampler at librosa's default
+    quality, so only one decode block is held in memory at a time.
+    """
+    import soundfile as sf
+    import soxr
+    if hasattr(source, "getvalue"): source = source.getvalue()
+    if isinstance(source, (bytes, bytearray)): source = io.BytesIO(source)
+    try:
+        f = sf.SoundFile(source)
+    except RuntimeError:
+        # Formats libsndfile cannot read go through librosa/audioread in memory
+        import librosa
+        if hasattr(source, "seek"): source.seek(0)
+        y, _ = librosa.load(source, sr=sr)
+        mm = _open_memmap(path, len(y)); mm[:len(y)] = y; mm.flush()
+        return mm[:len(y)]
+    with f:
+        native = f.samplerate
+        capacity = int(np.ceil(f.frames * sr / native)) + DECODE_BLOCK
+        mm = _open_memmap(path, capacity)
+        stream = soxr.ResampleStream(native, sr, 1, dtype="float32", quality="HQ") if native != sr else None
+        pos = 0
+
+        def write(out):
+            nonlocal mm, capacity, pos
+            if pos + len(out) > capacity:
+                mm.flush(); del mm
+                capacity = 2 * (pos + len(out))
+                os.truncate(path, capacity * 4)
+                mm = _open_memmap(path, capacity, "r+")
+            mm[pos:pos + len(out)] = out
+            pos += len(out)
+
+        for block in f.blocks(blocksize=DECODE_BLOCK, dtype="float32", always_2d=True):
+            mono = block.mean(axis=1, dtype=np.float32)
+            write(stream.resample_chunk(mono) if stream else mono)
+        if stream: write(stream.resample_chunk(np.zeros(0, dtype=np.float32), last=True))
+    mm.flush()
+    return mm[:pos]
+
+
+def _fill_looped(src, start, out):
+    pos, filled = start % len(src), 0
+    while filled < len(out):
+        take = min(len(out) - filled, len(src) - pos)
+        out[filled:filled + take] = src[pos:pos + take]
+        filled += take; pos = 0
+
+
+def _duck_gain(voice, bgm_gain, duck):
+    n_win = -(-len(voice) // DUCK_WINDOW)
+    padded = np.zeros(n_win * DUCK_WINDOW, dtype=np.float32); padded[:len(voice)] = voice
+    env = np.sqrt(np.mean(padded.reshape(n_win, DUCK_WINDOW) ** 2, axis=1))
+    gains = bgm_gain * (1 - duck * np.minimum(env / DUCK_THRESHOLD, 1.0))
+    centers = np.arange(n_win) * DUCK_WINDOW + DUCK_WINDOW / 2
+    return np.interp(np.arange(len(voice)), centers, gains).astype(np.float32)
+
+
+def mix_blocks(voice, bgm, voice_gain=1.0, bgm_gain=0.18, loop_bgm=False, duck=0.0, block=MIX_BLOCK):
+    """Yield the mix of ``voice`` and ``bgm`` in blocks of at most ``block`` samples.
+
+    Gains are applied in place into two reusable buffers, so the yielded
+    chunk is only valid until the next one is requested. Without
+    ``loop_bgm`` the mix stops at the shorter track; with it the BGM
+    repeats under the whole voice track. ``duck`` (0..1) lowers the BGM
+    while the voice is active.
+    """
+    n = len(voice) if loop_bgm else min(len(voice), len(bgm))
+    v_buf = np.empty(min(block, n), dtype=np.float32)
+    b_buf = np.empty_like(v_buf)
+    for start in range(0, n, block):
+        m = min(block, n - start)
+        v, b = v_buf[:m], b_buf[:m]
+        v[:] = voice[start:start + m]
+        if not loop_bgm: b[:] = bgm[start:start + m]
+        elif len(bgm): _fill_looped(bgm, start, b)
+        else: b[:] = 0
+        if duck > 0: b *= _duck_gain(v, bgm_gain, duck)
+        else: b *= bgm_gain
+        if voice_gain != 1.0: v *= voice_gain
+        v += b
+        np.clip(v, -1, 1, out=v)
+        yield v
+
+
+def mix_files(voice_src, bgm_src, out_path=None, sr=MIX_SR, voice_gain=1.0, bgm_gain=0.18,
+              loop_bgm=False, duck=0.0, on_progress=None):
+    """Decode both inputs to scratch memmaps, mix block by block and write a WAV.
+
+    Returns ``out_path`` (float32, constant memory for any length), or
+    without one an in-memory 16-bit WAV (BytesIO) whose size grows with the
+    mix, about 160 MB per hour at 22.05 kHz.
+    """
+    with tempfile.TemporaryDirectory(prefix="vocalis_mix_") as scratch:
+        voice = decode_to_memmap(voice_src, os.path.join(scratch, "voice.f32"), sr)
+        bgm = decode_to_memmap(bgm_src, os.path.join(scratch, "bgm.f32"), sr)
+        n = len(voice) if loop_bgm else min(len(voice), len(bgm))
+        chunks = mix_blocks(voice, bgm, voice_gain, bgm_gain, loop_bgm, duck)
+        return stream_to_wav(chunks, sr, out_path, total=n, on_progress=on_progress,
+                             subtype="FLOAT" if out_path else "PCM_16")
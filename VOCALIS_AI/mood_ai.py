@@ -0,0 +1,96 @@
+"""Batch task and genre recommendations from the Mood AI models.
+
+Usage: python mood_ai.py users.csv recommendations.csv [--hour H]
+
+The input CSV needs Mood and Activity columns and may have an Hour
+column (0-23); rows without one use --hour, or the current hour.
+"""
+import argparse
+import os
+import pickle
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+# --- MOOD AI BATCH SCORING ---
+FEATURE_COLUMNS = ["Mood_enc", "Activity_enc", "TimeOfDay", "Goal_enc"]
+SCORE_CHUNK = 50_000    # rows per predict call; bounds the KNN distance matrix
+HOURS = 24              # valid TimeOfDay values are 0 .. HOURS - 1
+
+
+class MoodRecommender:
+    """Vectorised front end for ``nb_task`` (task) and ``knn_music`` (genre).
+
+    Labels are encoded with dict lookups built once from the encoders'
+    ``classes_``; both models then run once per chunk over the whole
+    feature matrix instead of once per user.
+    """
+
+    def __init__(self, nb_model, knn_model, encoders):
+        self.nb_model, self.knn_model = nb_model, knn_model
+        self.index = {name: {str(c): i for i, c in enumerate(enc.classes_)} for name, enc in encoders.items()}
+        self.labels = {name: np.asarray(enc.classes_, dtype=object) for name, enc in encoders.items()}
+
+    def features(self, mood, activity, hour):
+        """(float feature matrix, mask of rows whose labels are known and hour is 0-23)."""
+        m = pd.Series(mood, dtype=object).map(self.index["le_mood"]).to_numpy(dtype=float)
+        a = pd.Series(activity, dtype=object).map(self.index["le_activity"]).to_numpy(dtype=float)
+        h = np.broadcast_to(np.asarray(hour, dtype=float), m.shape)
+        ok = ~(np.isnan(m) | np.isnan(a)) & (h >= 0) & (h <= HOURS - 1)   # NaN hours compare False
+        # Goal is not asked for on the Mood AI page; the models were trained with it, so it is fixed at 0
+        return np.column_stack([m, a, h, np.zeros_like(m)])[ok], ok
+
+    def recommend_batch(self, df, default_hour=None):
+        """``df`` with ``Task`` and ``Genre`` columns added (None for unknown labels or out-of-range hours)."""
+        if default_hour is None: default_hour = datetime.now().hour
+        hour = pd.to_numeric(df["Hour"], errors="coerce").fillna(default_hour) if "Hour" in df else default_hour
+        X, ok = self.features(df["Mood"].astype(str), df["Activity"].astype(str), hour)
+        task = np.full(len(df), None, dtype=object)
+        genre = np.full(len(df), None, dtype=object)
+        task_codes, genre_codes = [], []
+        for start in range(0, len(X), SCORE_CHUNK):
+            chunk = pd.DataFrame(X[start:start + SCORE_CHUNK], columns=FEATURE_COLUMNS)
+            task_codes.append(self.nb_model.predict(chunk))
+            genre_codes.append(self.knn_model.predict(chunk))
+        if task_codes:
+            task[ok] = self.labels["le_task"][np.concatenate(task_codes).astype(int)]
+            genre[ok] = self.labels["le_music"][np.concatenate(genre_codes).astype(int)]
+        out = df.copy()
+        out["Task"], out["Genre"] = task, genre
+        return out
+
+    def recommend(self, mood, activity, hour=None):
+        """(task, genre) for one user."""
+        row = self.recommend_batch(pd.DataFrame({"Mood": [mood], "Activity": [activity]}), hour).iloc[0]
+        return row["Task"], row["Genre"]
+
+
+def load_recommender(base_dir):
+    """MoodRecommender from the pickles in ``base_dir``, or None if they are missing or unreadable."""
+    paths = [os.path.join(base_dir, name) for name in ("nb_task.pkl", "knn_music.pkl", "encoders.pkl")]
+    if not all(os.path.exists(p) for p in paths): return None
+    try:
+        models = []
+        for p in paths:
+            with open(p, "rb") as f: models.append(pickle.load(f))
+        return MoodRecommender(*models)
+    except Exception:
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("users")
+    parser.add_argument("out")
+    parser.add_argument("--hour", type=int, default=None)
+    args = parser.parse_args()
+    recommender = load_recommender(os.path.dirname(os.path.abspath(__file__)))
+    if recommender is None: raise SystemExit("nb_task.pkl, knn_music.pkl or encoders.pkl missing")
+    scored = recommender.recommend_batch(pd.read_csv(args.users), args.hour)
+    scored.to_csv(args.out, index=False)
+    print(f"scored {scored['Task'].notna().sum()} of {len(scored)} users -> {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""Character voice morphing, interactive and batch.
+
+Usage: python voice_morph.py INPUT_DIR OUTPUT_DIR [--workers N] [--sr 22050] [--presets child robot]
+"""
+import argparse
+import os
+import time
+
+import numpy as np
+
+from audio_engine import PitchShifter
+
+MORPH_PRESETS = {
+    "Child 👶": {"n_steps": 5, "gain": 1.0},
+    "Villain 👿": {"n_steps": -5, "gain": 1.0},
+    "Robot 🤖": {"n_steps": 2, "gain": 1.5},
+}
+MORPH_STEPS = tuple(sorted({p["n_steps"] for p in MORPH_PRESETS.values()}))
+AUDIO_EXTS = (".wav", ".mp3", ".flac", ".ogg", ".m4a")
+
+
+def preset_slug(label):
+    return label.split()[0].lower()
+
+
+def morph(shifter, label):
+    preset = MORPH_PRESETS[label]
+    out = shifter.shift(preset["n_steps"])
+    if preset["gain"] != 1.0: out = np.clip(out * preset["gain"], -1, 1)
+    return out
+
+
+def morph_all(y, sr, labels=None, background=True):
+    """Render every preset from a single STFT analysis of ``y``."""
+    labels = labels or list(MORPH_PRESETS)
+    shifter = PitchShifter(y, sr)
+    if background: shifter.prerender({MORPH_PRESETS[l]["n_steps"] for l in labels})
+    return {label: morph(shifter, label) for label in labels}
+
+
+def morph_file(path, out_dir, sr=22050, labels=None, rel_dir=""):
+    """Morph one file into ``out_dir/<rel_dir>/<stem>_<ext>_<preset>.wav``; existing outputs are kept.
+
+    ``rel_dir`` mirrors the input's subfolder and the source extension is
+    kept in the name, so ``a/take.wav``, ``b/take.wav`` and ``take.mp3``
+    never map to the same output.
+    """
+    import librosa
+    import soundfile as sf
+    labels = labels or list(MORPH_PRESETS)
+    stem, ext = os.path.splitext(os.path.basename(path))
+    target_dir = os.path.join(out_dir, rel_dir)
+    targets = {l: os.path.join(target_dir, f"{stem}_{ext.lstrip('.').lower()}_{preset_slug(l)}.wav") for l in labels}
+    todo = [l for l, t in targets.items() if not os.path.exists(t)]
+    if todo:
+        os.makedirs(target_dir, exist_ok=True)
+        y, sr = librosa.load(path, sr=sr)
+        # One process per file already saturates the cores; render serially inside it
+        for label, out in morph_all(y, sr, todo, background=False).items():
+            sf.write(targets[label], out, sr)
+    return list(targets.values())
+
+
+def iter_audio_files(in_dir):
+    for root, _, files in os.walk(in_dir):
+        for name in sorted(files):
+            if name.lower().endswith(AUDIO_EXTS): yield os.path.join(root, name)
+
+
+def morph_directory(in_dir, out_dir, sr=22050, labels=None, workers=None, on_done=None):
+    """Morph every audio file under ``in_dir`` on a process pool; returns the output paths."""
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+    os.makedirs(out_dir, exist_ok=True)
+    outputs = []
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+        futures = {pool.submit(morph_file, p, out_dir, sr, labels, os.path.relpath(os.path.dirname(p), in_dir)): p
+                   for p in iter_audio_files(in_dir)}
+        for fut in as_completed(futures):
+            try: outputs.extend(fut.result())
+            except Exception as e: print(f"failed: {futures[fut]}: {e}")
+            if on_done: on_done(futures[fut])
+    return outputs
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("input_dir")
+    parser.add_argument("output_dir")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--sr", type=int, default=22050)
+    parser.add_argument("--presets", nargs="*", choices=[preset_slug(l) for l in MORPH_PRESETS], default=None)
+    args = parser.parse_args()
+
+    labels = [l for l in MORPH_PRESETS if args.presets is None or preset_slug(l) in args.presets]
+    done, start = [0], time.perf_counter()
+
+    def progress(path):
+        done[0] += 1
+        print(f"[{done[0]}] {path}  ({done[0] / (time.perf_counter() - start):.2f} files/s)")
+
+    outputs = morph_directory(args.input_dir, args.output_dir, args.sr, labels, args.workers, progress)
+    print(f"{len(outputs)} variants in {args.output_dir}")
+
+
+if __name__ == "__main__":
+    main()